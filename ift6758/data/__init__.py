@@ -1,5 +1,9 @@
 from ift6758.data.vecteurs import *
+from ift6758.data.registry import *
 from ift6758.data.datacleaning import *
 from ift6758.data.getdata import *
 from ift6758.data.dataIng import *
 from ift6758.data.utils import *
+from ift6758.data.dimensions import *
+from ift6758.data.live import *
+from ift6758.data.store import *
\ No newline at end of file
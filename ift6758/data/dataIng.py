@@ -22,16 +22,12 @@ def ing_event(df: pd.DataFrame, df_players: pd.DataFrame) -> pd.DataFrame:
     df_details['shootingPlayerId'] = df_details['shootingPlayerId'].astype(int)
     df_details['goalieInNetId'] = df_details['goalieInNetId'].astype('Int64')  
 
-    df_details = pd.merge(df_players, df_details, left_on='playerId', right_on='shootingPlayerId', how='right').drop(
-        columns=['playerId'])
-    df_details['shootingPlayer'] = df_details['firstName'] + ' ' + df_details['lastName']
-    df_details.drop(['firstName', 'lastName'], axis=1, inplace=True)
-
-    df_details = pd.merge(df_players, df_details, left_on='playerId', right_on='goalieInNetId', how='right').drop(
-        columns=['playerId'])
-
-    df_details['goaliePlayer'] = df_details['firstName'] + ' ' + df_details['lastName']
-    df_details.drop(['firstName', 'lastName'], axis=1, inplace=True)
+    # Noms des joueurs par identifiant : une recherche au lieu de deux fusions
+    names = pd.Series((df_players['firstName'] + ' ' + df_players['lastName']).to_numpy(),
+                      index=df_players['playerId'].to_numpy())
+    names = names[~names.index.duplicated()]
+    df_details['shootingPlayer'] = df_details['shootingPlayerId'].map(names)
+    df_details['goaliePlayer'] = df_details['goalieInNetId'].map(names)
 
     return df_details
 
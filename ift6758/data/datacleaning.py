@@ -1,10 +1,25 @@
+from concurrent.futures import ProcessPoolExecutor
+
 import pandas as pd
 
 from ift6758.data.vecteurs import *
+from ift6758.data.registry import *
 from ift6758.data.getdata import *
 from ift6758.data.dataIng import *
 from ift6758.data.utils import *
+from ift6758.data.dimensions import Dimensions, resolve_by_game
 from ift6758.features.play_by_play import NHLData
+from ift6758.features.storage import CLEANING_FIELDS, project
+
+GAME_TYPES = ("regular_season", "playoffs")
+
+# Version du calcul des caractéristiques : à incrémenter à chaque changement de df_convert /
+# df_convert_season pour que update_feature_store recalcule tous les matchs
+# (3 : le magasin garde les identifiants des joueurs et des équipes, et non plus leurs noms)
+FEATURE_VERSION = 3
+
+# Lecteur du cache propre à chaque processus du pool (voir init_worker)
+worker_data = None
 
 
 def df_convert(game_nhl: dict) -> pd.DataFrame:
@@ -46,24 +61,128 @@ def df_convert(game_nhl: dict) -> pd.DataFrame:
     clean_df.insert(5, 'eventOwnerTeam', df_details['teamName'])
     clean_df['teamSide'] = df_details['teamSide']
 
-    clean_df['emptyGoalNet'] = empty_goal_func(clean_df).astype(int)
-    clean_df['isGoalAdvantage'] = goal_situation(clean_df)
+    situation = situation_code(clean_df)
+    clean_df['emptyGoalNet'] = empty_goal_func(clean_df, situation).astype(int)
+    clean_df['isGoalAdvantage'] = goal_situation(clean_df, situation)
 
     clean_df['isGoal'] = clean_df['typeDescKey'].apply(lambda x: 1 if x == 'goal' else 0)
 
     clean_df = zoneshoot(clean_df)
 
     clean_df.drop('situationCode', axis=1, inplace=True)
-    return clean_df
+    return compact_dtypes(clean_df)
+
+
+def df_convert_season(games, dimensions: Dimensions = None, names: bool = True) -> pd.DataFrame:
+    # Nettoyage de tous les matchs d'une saison d'un coup, en colonnes : même résultat que
+    # pd.concat([df_convert(game) for game in games]), y compris l'index propre à chaque match.
+    # names=False : les tirs gardent les identifiants (eventOwnerTeamId, shootingPlayerId, goalieId)
+    # et les noms se retrouvent avec dimensions.resolve (dernier nom connu) ; names=True : noms en
+    # vigueur dans chaque match, comme df_convert
+    df_plays, dimensions, sides, game_names = get_season_plays(games, dimensions)
+
+    id_game = df_plays['idGame']
+    first_play = id_game.ne(id_game.shift())
+
+    number_period = df_plays['numberPeriod'].astype(int)
+    clock = df_plays['timeInPeriod'].str.split(':', n=1, expand=True).astype(int)
+    game_seconds = clock[0] * 60 + clock[1] + 20 * 60 * (number_period - 1)
+
+    # Événement précédent, dans le même match
+    previous_event_type = df_plays['typeDescKey'].shift().mask(first_play)
+    time_since_last_event = game_seconds.diff().abs().mask(first_play, 0)
+    previous_x = pd.to_numeric(df_plays['xCoord'], errors='coerce').astype(float).shift().mask(first_play)
+    previous_y = pd.to_numeric(df_plays['yCoord'], errors='coerce').astype(float).shift().mask(first_play)
+
+    shots = df_plays['typeDescKey'].isin(['shot-on-goal', 'goal']).to_numpy()
+    df_shots = df_plays[shots]
+    shot_games = df_shots['idGame'].to_numpy()
+
+    shooter_id = (df_shots['shootingPlayerId'].fillna(0) + df_shots['scoringPlayerId'].fillna(0)).astype(int)
+    goalie_id = df_shots['goalieInNetId'].fillna(0).astype(int)
+    team_id = df_shots['eventOwnerTeamId'].fillna(0).astype(int)
+
+    clean_df = pd.DataFrame({
+        'idGame': shot_games,
+        'periodType': df_shots['periodType'].to_numpy(),
+        'numberPeriod': number_period[shots].to_numpy(),
+        'typeDescKey': df_shots['typeDescKey'].to_numpy(),
+        'eventOwnerTeamId': team_id.to_numpy(),
+        'gameSeconds': game_seconds[shots].to_numpy(),
+        'previousEventType': previous_event_type[shots].to_numpy(),
+        'timeSinceLastEvent': time_since_last_event[shots].to_numpy(),
+        'previousXCoord': previous_x[shots].to_numpy(),
+        'previousYCoord': previous_y[shots].to_numpy(),
+        'xCoord': pd.Series(df_shots['xCoord'].tolist()),
+        'yCoord': pd.Series(df_shots['yCoord'].tolist()),
+        'zoneShoot': df_shots['zoneCode'].to_numpy(),
+        'shootingPlayerId': shooter_id.to_numpy(),
+        'goalieId': goalie_id.to_numpy(),
+        'shotType': df_shots['shotType'].to_numpy(),
+        'teamSide': pd.Series([sides.get(key, np.nan) for key in zip(shot_games, team_id)], dtype=object),
+        'situationCode': df_shots['situationCode'].to_numpy(),
+    })
+
+    situation = situation_code(clean_df)
+    clean_df['emptyGoalNet'] = empty_goal_func(clean_df, situation).astype(int)
+    clean_df['isGoalAdvantage'] = goal_situation(clean_df, situation)
+    clean_df['isGoal'] = (clean_df['typeDescKey'] == 'goal').astype(int)
+
+    clean_df = zoneshoot(clean_df)
+
+    clean_df.drop('situationCode', axis=1, inplace=True)
+    clean_df.index = clean_df.groupby('idGame', sort=False).cumcount().to_numpy()
+    if names:
+        clean_df = resolve_by_game(clean_df, game_names)
+    return compact_dtypes(clean_df)
+
+
+def data_clean_batch(raw_data: NHLData, first_year: int, last_year: int, dimensions: Dimensions = None,
+                     names: bool = True) -> tuple:
+    # Comme data_clean_lazy, mais chaque saison est nettoyée d'un bloc par df_convert_season ;
+    # chaque saison est une liste d'un seul DataFrame pour rester compatible avec dic_to_df.
+    # dimensions (ex. Dimensions() pour data/dimensions.json) est complété puis sauvegardé.
+    regular_season = {}
+    playoff = {}
+
+    for year in range(first_year, last_year + 1):
+        regular_season[year] = [df_convert_season(raw_data.iter_games(year, "regular_season"), dimensions, names)]
+        playoff[year] = [df_convert_season(raw_data.iter_games(year, "playoffs"), dimensions, names)]
+
+    if dimensions is not None:
+        dimensions.save()
+
+    return regular_season, playoff
 
 
-def data_clean(raw_data: NHLData) -> tuple:
+def init_worker(storage: str, projection: str):
+    global worker_data
+    worker_data = NHLData(storage=storage, projection=projection)
+
+
+def convert_cached_game(task: tuple) -> pd.DataFrame:
+    # Le processus relit lui-même le match dans le cache : seule la référence est envoyée
+    year, game_type, game, entry = task
+    return df_convert(worker_data.read_game(year, game_type, game, entry))
+
+
+def df_convert_many(games: list, workers: int = 1, chunksize: int = 8) -> list:
+    if workers == 1:
+        return [df_convert(game) for game in games]
+
+    # Seuls les champs utiles au nettoyage sont envoyés aux processus
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(df_convert, [project(game, CLEANING_FIELDS) for game in games],
+                                 chunksize=chunksize))
+
+
+def data_clean(raw_data: NHLData, workers: int = 1, chunksize: int = 8) -> tuple:
     
     regular_season = {} 
     for year in raw_data.regular_season.keys():
         yearly_data = raw_data.regular_season[year]
 
-        regular_season[year] = [df_convert(game) for game in yearly_data]
+        regular_season[year] = df_convert_many(yearly_data, workers, chunksize)
 
     del raw_data.regular_season 
 
@@ -73,8 +192,38 @@ def data_clean(raw_data: NHLData) -> tuple:
     for year in raw_data.playoffs.keys():
         yearly_data = raw_data.playoffs[year]
 
-        playoff[year] = [df_convert(game) for game in yearly_data]
+        playoff[year] = df_convert_many(yearly_data, workers, chunksize)
 
     del raw_data.playoffs 
 
     return regular_season, playoff
+
+
+def data_clean_lazy(raw_data: NHLData, first_year: int, last_year: int, workers: int = 1,
+                    chunksize: int = 8) -> tuple:
+    # Même résultat que data_clean, mais les matchs bruts sont lus un à un depuis le cache :
+    # seuls les DataFrames nettoyés restent en mémoire
+    years = range(first_year, last_year + 1)
+    cleaned = {game_type: {} for game_type in GAME_TYPES}
+
+    if workers == 1:
+        for year in years:
+            for game_type in GAME_TYPES:
+                cleaned[game_type][year] = [df_convert(game) for game in raw_data.iter_games(year, game_type)]
+        return cleaned["regular_season"], cleaned["playoffs"]
+
+    # Un seul pool pour toutes les saisons ; les résultats reviennent dans l'ordre des tâches
+    tasks = [(year, game_type, game, entry) for year in years for game_type in GAME_TYPES
+             for game, entry in raw_data.game_index(year, game_type)]
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                             initargs=(raw_data.storage, raw_data.projection)) as executor:
+        for (year, game_type, _, _), df in zip(tasks, executor.map(convert_cached_game, tasks,
+                                                                   chunksize=chunksize)):
+            cleaned[game_type].setdefault(year, []).append(df)
+
+    for game_type in GAME_TYPES:
+        for year in years:
+            cleaned[game_type].setdefault(year, [])
+
+    return cleaned["regular_season"], cleaned["playoffs"]
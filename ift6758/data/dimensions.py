@@ -0,0 +1,89 @@
+import json
+import os
+from os.path import isfile, dirname
+
+import numpy as np
+import pandas as pd
+
+# Colonnes d'identifiants des tirs -> colonnes de noms correspondantes
+ID_COLUMNS = {'eventOwnerTeamId': 'eventOwnerTeam', 'shootingPlayerId': 'shootingPlayer', 'goalieId': 'goaliePlayer'}
+
+
+class Dimensions:
+    # Tables des joueurs et des équipes de tous les matchs lus, clé entière (playerId, teamId).
+    # Mises à jour match par match et gardées dans data/dimensions.json : les tirs ne portent
+    # que les identifiants et les noms ne sont résolus qu'à la demande (resolve).
+    # path=None : tables en mémoire seulement.
+    filename = "data/dimensions.json"
+
+    def __init__(self, path: str = filename):
+        self.path = path
+        self.players = {}
+        self.teams = {}
+        self.nb_changes = 0
+
+        if path is not None and isfile(path):
+            with open(self.path, 'r', encoding='utf-8') as file:
+                dimensions = json.load(file)
+            self.players = {int(player_id): name for player_id, name in dimensions['players'].items()}
+            self.teams = {int(team_id): name for team_id, name in dimensions['teams'].items()}
+
+    def update(self, game_nhl: dict):
+        # Le dernier nom vu l'emporte (ex. changement d'orthographe d'un joueur)
+        for spot in game_nhl['rosterSpots']:
+            name = spot['firstName']['default'] + ' ' + spot['lastName']['default']
+            if self.players.get(spot['playerId']) != name:
+                self.players[spot['playerId']] = name
+                self.nb_changes += 1
+
+        for side in ('home', 'away'):
+            team = game_nhl[f'{side}Team']
+            if self.teams.get(team['id']) != team['name']['default']:
+                self.teams[team['id']] = team['name']['default']
+                self.nb_changes += 1
+
+    def player_names(self, player_ids: pd.Series) -> pd.Series:
+        # Identifiant inconnu ou 0 (pas de gardien) -> NaN
+        return player_ids.map(self.players)
+
+    def team_names(self, team_ids: pd.Series) -> pd.Series:
+        return team_ids.map(self.teams)
+
+    def resolve(self, df: pd.DataFrame) -> pd.DataFrame:
+        # Remplace les colonnes d'identifiants par les noms (dernier nom connu), à la même position
+        df = df.copy()
+        for id_column, name_column in ID_COLUMNS.items():
+            if id_column not in df.columns:
+                continue
+            lookup = self.team_names if id_column == 'eventOwnerTeamId' else self.player_names
+            df[id_column] = lookup(df[id_column]).astype('category')
+            df.rename(columns={id_column: name_column}, inplace=True)
+        return df
+
+    def save(self):
+        if self.path is None or (not self.nb_changes and isfile(self.path)):
+            return
+
+        os.makedirs(dirname(self.path) or '.', exist_ok=True)
+        dimensions = {'players': self.players, 'teams': self.teams}
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(dimensions, file, indent=1, sort_keys=True, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+        self.nb_changes = 0
+
+
+def resolve_by_game(df: pd.DataFrame, game_names: dict) -> pd.DataFrame:
+    # Comme Dimensions.resolve, mais avec le nom en vigueur dans chaque match :
+    # game_names = {'teams': {(idGame, teamId): nom}, 'players': {(idGame, playerId): nom}}
+    df = df.copy()
+    for id_column, name_column in ID_COLUMNS.items():
+        if id_column not in df.columns:
+            continue
+        names = game_names['teams'] if id_column == 'eventOwnerTeamId' else game_names['players']
+        lookup = pd.Series(list(names.values()), index=pd.MultiIndex.from_tuples(list(names.keys())), dtype=object) \
+            if names else pd.Series(dtype=object)
+        keys = pd.MultiIndex.from_arrays([df['idGame'].to_numpy(), df[id_column].to_numpy()])
+        df[id_column] = pd.Categorical(lookup.reindex(keys).to_numpy() if names else np.full(len(df), np.nan))
+        df.rename(columns={id_column: name_column}, inplace=True)
+    return df
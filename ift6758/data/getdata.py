@@ -1,5 +1,8 @@
+import numpy as np
 import pandas as pd
 
+from ift6758.data.dimensions import Dimensions
+
 
 def get_player(game_nhl: dict) -> pd.DataFrame:
     
@@ -15,3 +18,52 @@ def get_teams(game_nhl: dict) -> pd.DataFrame:
     away_team = {'teamId': game_nhl['awayTeam']['id'], 'teamName': game_nhl['awayTeam']['name']['default'],
                  'teamSide': 'away'}
     return pd.DataFrame([home_team, away_team])
+
+
+PLAY_DETAILS = ['xCoord', 'yCoord', 'zoneCode', 'eventOwnerTeamId', 'shootingPlayerId', 'scoringPlayerId',
+                'goalieInNetId', 'shotType']
+
+
+def get_season_plays(games, dimensions: Dimensions = None) -> tuple:
+    # Aplatit les jeux de plusieurs matchs en une seule table en colonnes, clé idGame.
+    # Les joueurs et équipes rencontrés sont ajoutés à dimensions (créées au besoin) ;
+    # retourne aussi le côté de chaque équipe {(idGame, teamId): côté} et les noms propres à
+    # chaque match {'teams': {(idGame, teamId): nom}, 'players': {(idGame, playerId): nom}}
+    # (un nom peut changer en cours de saison). Les matchs peuvent être lus un à un (itérateur).
+    columns = {name: [] for name in ['idGame', 'periodType', 'numberPeriod', 'timeInPeriod', 'situationCode',
+                                     'typeDescKey'] + PLAY_DETAILS}
+    if dimensions is None:
+        dimensions = Dimensions(path=None)
+    sides = {}
+    game_names = {'teams': {}, 'players': {}}
+
+    for game_nhl in games:
+        id_game = game_nhl['id']
+        dimensions.update(game_nhl)
+        for side in ('home', 'away'):
+            team = game_nhl[f'{side}Team']
+            sides[(id_game, team['id'])] = side
+            game_names['teams'][(id_game, team['id'])] = team['name']['default']
+        for spot in game_nhl['rosterSpots']:
+            game_names['players'][(id_game, spot['playerId'])] = (spot['firstName']['default'] + ' '
+                                                                  + spot['lastName']['default'])
+
+        for play in game_nhl['plays']:
+            period = play['periodDescriptor']
+            details = play.get('details')
+            if not isinstance(details, dict):
+                details = {}
+
+            columns['idGame'].append(id_game)
+            columns['periodType'].append(period['periodType'])
+            columns['numberPeriod'].append(period['number'])
+            columns['timeInPeriod'].append(play['timeInPeriod'])
+            columns['situationCode'].append(play.get('situationCode', np.nan))
+            columns['typeDescKey'].append(play['typeDescKey'])
+            for name in PLAY_DETAILS:
+                columns[name].append(details.get(name, np.nan))
+
+    # Les coordonnées gardent leurs valeurs brutes (entiers ou non) pour conserver les types de df_convert
+    df_plays = pd.DataFrame({name: pd.Series(values, dtype=object if name in ('xCoord', 'yCoord') else None)
+                             for name, values in columns.items()})
+    return df_plays, dimensions, sides, game_names
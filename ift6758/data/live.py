@@ -0,0 +1,131 @@
+import numpy as np
+import pandas as pd
+
+from ift6758.data.registry import ZONESHOOT_FEATURES, evaluate
+from ift6758.data.utils import situation_code, empty_goal_func, goal_situation, compact_dtypes
+
+SHOT_TYPES = ('shot-on-goal', 'goal')
+
+
+class LiveGame:
+    # Caractéristiques d'un match en cours, calculées au fur et à mesure des interrogations de l'API :
+    # update() ne traite que les jeux ajoutés depuis l'appel précédent et retourne les nouveaux tirs,
+    # avec les mêmes colonnes et valeurs que df_convert sur le match complet.
+    # L'état gardé d'un appel à l'autre : le jeu précédent (événement, temps, position), le dernier
+    # tir de chaque équipe (temps de pression offensive) et le côté initial de l'équipe locale.
+    # Ce côté est déduit du premier tir local en zone offensive : les tirs qui le précèdent sont
+    # retenus jusqu'à ce qu'il soit connu.
+
+    def __init__(self):
+        self.id_game = None
+        self.nb_plays = 0
+        self.nb_shots = 0
+        self.players = {}
+        self.teams = {}
+        self.previous_play = None
+        self.last_shot_seconds = {}
+        self.home_team_initial_side = None
+        self.pending = []
+        self.empty = None
+
+    def update(self, game_nhl: dict) -> pd.DataFrame:
+        if self.id_game is None:
+            self.id_game = game_nhl['id']
+            for side in ('home', 'away'):
+                team = game_nhl[f'{side}Team']
+                self.teams[team['id']] = (team['name']['default'], side)
+
+        # Des joueurs peuvent s'ajouter à la feuille de match en cours de partie
+        for spot in game_nhl.get('rosterSpots', []):
+            self.players[spot['playerId']] = spot['firstName']['default'] + ' ' + spot['lastName']['default']
+
+        plays = game_nhl['plays'][self.nb_plays:]
+        self.nb_plays += len(plays)
+        for play in plays:
+            self.__add_play(play)
+
+        if self.home_team_initial_side is None or not self.pending:
+            # Aucun tir à émettre : tableau vide, construit une seule fois
+            if self.empty is None:
+                self.empty = self.__shots([])
+            return self.empty
+
+        rows, self.pending = self.pending, []
+        return self.__shots(rows)
+
+    def __add_play(self, play: dict):
+        period = play['periodDescriptor']
+        details = play.get('details')
+        if not isinstance(details, dict):
+            details = {}
+
+        minutes, seconds = play['timeInPeriod'].split(':', 1)
+        number_period = int(period['number'])
+        game_seconds = int(minutes) * 60 + int(seconds) + 20 * 60 * (number_period - 1)
+
+        if play['typeDescKey'] in SHOT_TYPES:
+            previous = self.previous_play
+            team_name, team_side = self.teams.get(details.get('eventOwnerTeamId'), (np.nan, np.nan))
+            shooter = details.get('shootingPlayerId', 0) + details.get('scoringPlayerId', 0)
+            x = details.get('xCoord', np.nan)
+            self.pending.append({
+                'idGame': self.id_game,
+                'periodType': period['periodType'],
+                'numberPeriod': number_period,
+                'typeDescKey': play['typeDescKey'],
+                'eventOwnerTeam': team_name,
+                'gameSeconds': game_seconds,
+                'previousEventType': previous['typeDescKey'] if previous else np.nan,
+                'timeSinceLastEvent': float(abs(game_seconds - previous['gameSeconds'])) if previous else 0.0,
+                'previousXCoord': previous['xCoord'] if previous else np.nan,
+                'previousYCoord': previous['yCoord'] if previous else np.nan,
+                'xCoord': x,
+                'yCoord': details.get('yCoord', np.nan),
+                'zoneShoot': details.get('zoneCode', np.nan),
+                'shootingPlayer': self.players.get(shooter, np.nan),
+                'goaliePlayer': self.players.get(details.get('goalieInNetId'), np.nan),
+                'shotType': details.get('shotType', np.nan),
+                'teamSide': team_side,
+                'situationCode': play.get('situationCode', np.nan),
+            })
+            if self.home_team_initial_side is None and details.get('zoneCode') == 'O' and team_side == 'home':
+                self.home_team_initial_side = 'right' if x < 0 else 'left'
+
+        self.previous_play = {'typeDescKey': play['typeDescKey'], 'gameSeconds': game_seconds,
+                              'xCoord': details.get('xCoord', np.nan), 'yCoord': details.get('yCoord', np.nan)}
+
+    def __shots(self, rows: list) -> pd.DataFrame:
+        clean_df = pd.DataFrame(rows, columns=['idGame', 'periodType', 'numberPeriod', 'typeDescKey',
+                                               'eventOwnerTeam', 'gameSeconds', 'previousEventType',
+                                               'timeSinceLastEvent', 'previousXCoord', 'previousYCoord', 'xCoord',
+                                               'yCoord', 'zoneShoot', 'shootingPlayer', 'goaliePlayer', 'shotType',
+                                               'teamSide', 'situationCode'])
+        for column in ('previousXCoord', 'previousYCoord', 'xCoord', 'yCoord'):
+            clean_df[column] = clean_df[column].astype(float)
+        clean_df.index = np.arange(self.nb_shots, self.nb_shots + len(clean_df))
+        self.nb_shots += len(clean_df)
+
+        situation = situation_code(clean_df)
+        clean_df['emptyGoalNet'] = empty_goal_func(clean_df, situation).astype(int)
+        clean_df['isGoalAdvantage'] = goal_situation(clean_df, situation)
+        clean_df['isGoal'] = (clean_df['typeDescKey'] == 'goal').astype(int)
+
+        geometry = [name for name in ZONESHOOT_FEATURES if name != 'offensivePressureTime']
+        features = evaluate(clean_df, geometry,
+                            known={'_homeTeamInitialSide': np.full(len(clean_df), self.home_team_initial_side)})
+        for column in geometry:
+            clean_df[column] = features[column]
+        clean_df['offensivePressureTime'] = self.__pressure(clean_df['teamSide'], clean_df['gameSeconds'])
+
+        clean_df.drop('situationCode', axis=1, inplace=True)
+        return compact_dtypes(clean_df)
+
+    def __pressure(self, team_side: pd.Series, game_seconds: pd.Series) -> list:
+        # Temps depuis le tir précédent de la même équipe, 0 pour son premier tir
+        pressure = []
+        for side, seconds in zip(team_side, game_seconds):
+            last = self.last_shot_seconds.get(side) if isinstance(side, str) else None
+            pressure.append(0.0 if last is None else float(seconds - last))
+            if isinstance(side, str):
+                self.last_shot_seconds[side] = seconds
+        return pressure
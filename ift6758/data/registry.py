@@ -0,0 +1,158 @@
+import numpy as np
+import pandas as pd
+
+from ift6758.data.vecteurs import GOAL_COORD, row_dot, v_angles, home_initial_sides
+from ift6758.visualizations.visualisations_avancees.utils import get_coords
+
+# Caractéristiques calculées à partir des colonnes du tableau nettoyé : nom -> (entrées, fonction).
+# Les entrées sont des colonnes ou d'autres caractéristiques ; les noms commençant par "_" sont
+# des étapes intermédiaires partagées (ex. coordonnées ajustées), jamais ajoutées au tableau.
+FEATURES = {}
+
+# Colonnes ajoutées par zoneshoot, dans l'ordre
+ZONESHOOT_FEATURES = ['shotDistance', 'distanceFromLastEvent', 'rebound', 'speedFromLastEvent', 'shotAngle',
+                      'reboundAngleShot', 'offensivePressureTime']
+
+
+def register_feature(name: str, inputs: list):
+    def register(function):
+        FEATURES[name] = (inputs, function)
+        return function
+    return register
+
+
+@register_feature('_homeTeamInitialSide', ['idGame', 'zoneShoot', 'teamSide', 'xCoord'])
+def home_team_initial_side(id_game, zone_shoot, team_side, x):
+    df = pd.DataFrame({'idGame': id_game, 'zoneShoot': zone_shoot, 'teamSide': team_side, 'xCoord': x})
+    return df['idGame'].map(home_initial_sides(df)).to_numpy()
+
+
+@register_feature('_adjustedCoord', ['xCoord', 'yCoord', 'numberPeriod', 'teamSide', '_homeTeamInitialSide'])
+def adjusted_coord(x, y, number_period, team_side, home_team_initial_side):
+    return np.column_stack(get_coords(np.asarray(x, dtype=float), np.asarray(y, dtype=float), number_period,
+                                      team_side, home_team_initial_side))
+
+
+@register_feature('_adjustedLastEvent', ['previousXCoord', 'previousYCoord', 'numberPeriod', 'teamSide',
+                                         '_homeTeamInitialSide'])
+def adjusted_last_event(previous_x, previous_y, number_period, team_side, home_team_initial_side):
+    return adjusted_coord(previous_x, previous_y, number_period, team_side, home_team_initial_side)
+
+
+@register_feature('_toGoal', ['_adjustedCoord'])
+def to_goal(adjusted):
+    return adjusted - GOAL_COORD
+
+
+@register_feature('shotDistance', ['_toGoal'])
+def shot_distance(to_goal):
+    return np.round(np.sqrt(row_dot(to_goal, to_goal)), decimals=1)
+
+
+@register_feature('distanceFromLastEvent', ['xCoord', 'yCoord', 'previousXCoord', 'previousYCoord'])
+def distance_from_last_event(x, y, previous_x, previous_y):
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    previous_x, previous_y = np.asarray(previous_x, dtype=float), np.asarray(previous_y, dtype=float)
+    from_last_event = np.column_stack((x - previous_x, y - previous_y))
+    distance = np.round(np.sqrt(row_dot(from_last_event, from_last_event)), decimals=1)
+    distance[np.isnan(previous_x)] = np.nan
+    return distance
+
+
+@register_feature('rebound', ['previousEventType'])
+def rebound(previous_event_type):
+    return np.asarray(previous_event_type) == 'shot-on-goal'
+
+
+@register_feature('speedFromLastEvent', ['distanceFromLastEvent', 'timeSinceLastEvent'])
+def speed_from_last_event(distance, time_since_last_event):
+    time_since_last_event = np.asarray(time_since_last_event, dtype=float)
+    speed = np.zeros(len(distance))
+    np.divide(distance, time_since_last_event, out=speed, where=time_since_last_event != 0)
+    return speed
+
+
+@register_feature('shotAngle', ['_toGoal'])
+def shot_angle(to_goal):
+    return v_angles(to_goal, np.broadcast_to(np.array([0.0, -89.0]), to_goal.shape))
+
+
+@register_feature('reboundAngleShot', ['rebound', '_adjustedLastEvent', 'shotAngle'])
+def rebound_angle_shot(is_rebound, adjusted_last_event, angle):
+    # Angle du rebond : seulement pour les tirs qui suivent un tir cadré
+    rebound_angle = np.zeros(len(is_rebound))
+    rebound_angle[is_rebound] = v_angles(adjusted_last_event[is_rebound] - GOAL_COORD,
+                                         np.array([0, -89]) + angle[is_rebound][:, None])
+    return rebound_angle
+
+
+@register_feature('offensivePressureTime', ['idGame', 'teamSide', 'gameSeconds'])
+def offensive_pressure_time(id_game, team_side, game_seconds):
+    # Temps depuis le tir précédent de la même équipe (le côté identifie l'équipe dans un match)
+    df = pd.DataFrame({'idGame': id_game, 'teamSide': team_side, 'gameSeconds': game_seconds})
+    return df.groupby(['idGame', 'teamSide'], sort=False)['gameSeconds'].diff().fillna(0).to_numpy()
+
+
+def evaluate(df: pd.DataFrame, names: list, known: dict = None) -> dict:
+    # Calcule les caractéristiques demandées et seulement leurs dépendances, chacune une fois.
+    # known : valeurs déjà connues, utilisées telles quelles (ex. _homeTeamInitialSide d'un match en direct)
+    values = dict(known or {})
+
+    def value(name):
+        if name not in values:
+            if name in FEATURES:
+                inputs, function = FEATURES[name]
+                values[name] = function(*[value(input_name) for input_name in inputs])
+            elif name in df.columns:
+                values[name] = df[name].to_numpy()
+            else:
+                raise KeyError(f"Unknown feature or column: {name}")
+        return values[name]
+
+    return {name: value(name) for name in names}
+
+
+def compute_features(df: pd.DataFrame, names: list, cache: dict = None) -> pd.DataFrame:
+    # cache : {(idGame, caractéristique): valeurs du match}, réutilisé d'un appel à l'autre.
+    # Seuls les matchs absents du cache sont calculés, en une passe ; df doit contenir des matchs entiers.
+    if cache is None:
+        return pd.DataFrame(evaluate(df, names), index=df.index)
+
+    games = df['idGame'].to_numpy()
+    rows = pd.Series(games).groupby(games, sort=False).indices
+    missing = [game for game, positions in rows.items()
+               if any(len(cache.get((game, name), ())) != len(positions) for name in names)]
+
+    if missing:
+        df_missing = df[np.isin(games, missing)]
+        computed = evaluate(df_missing, names)
+        missing_rows = pd.Series(df_missing['idGame'].to_numpy()).groupby(
+            df_missing['idGame'].to_numpy(), sort=False).indices
+        for game, positions in missing_rows.items():
+            for name in names:
+                cache[(game, name)] = computed[name][positions]
+
+    order = np.concatenate(list(rows.values()))
+    features = {}
+    for name in names:
+        values = np.concatenate([cache[(game, name)] for game in rows])
+        features[name] = np.empty_like(values)
+        features[name][order] = values
+    return pd.DataFrame(features, index=df.index)
+
+
+def select_features(df: pd.DataFrame, names: list, cache: dict = None) -> pd.DataFrame:
+    # Colonnes déjà présentes (ex. CSV nettoyé) prises telles quelles, les autres calculées
+    missing = [name for name in names if name not in df.columns]
+    if not missing:
+        return df[names]
+    return pd.concat([df[[name for name in names if name in df.columns]],
+                      compute_features(df, missing, cache)], axis=1)[names]
+
+
+def zoneshoot(clean_df: pd.DataFrame) -> pd.DataFrame:
+    # Ajoute toutes les caractéristiques géométriques et le temps de pression offensive
+    features = compute_features(clean_df, ZONESHOOT_FEATURES)
+    for column in ZONESHOOT_FEATURES:
+        clean_df[column] = features[column].to_numpy()
+    return clean_df
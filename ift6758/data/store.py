@@ -0,0 +1,271 @@
+import glob
+import json
+import os
+import shutil
+import sys
+from os.path import join, basename, dirname, isfile
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from ift6758.data.datacleaning import FEATURE_VERSION, GAME_TYPES, df_convert_season
+from ift6758.data.dimensions import ID_COLUMNS, Dimensions
+from ift6758.data.utils import compact_dtypes
+from ift6758.features.play_by_play import NHLData
+from ift6758.visualizations.visualisations_simples.utils import dic_to_df
+
+# Jeu de données nettoyé en Parquet, partitionné par saison et type de match :
+# data/features/Year=2016/gameType=regular-season/part-0.parquet
+FEATURE_STORE = "data/features"
+PARTITION_COLUMNS = ['Year', 'gameType']
+
+# Partitions construites par update_feature_store : pour chaque match, l'empreinte du match
+# brut (hash du manifeste), la version des caractéristiques et le fichier qui contient ses lignes
+BUILDS_FILE = "builds.json"
+GAME_TYPE_LABELS = {"regular_season": ("02", "regular-season"), "playoffs": ("03", "playoffs")}
+
+# Mémoire de travail de df_convert_season par match (pic mesuré ~0,2 Mo pour ~300 jeux, doublé
+# par prudence) : fixe la taille des lots de build_dataset à partir de chunk_memory_mb
+CLEANING_MB_PER_GAME = 0.4
+
+
+def partition_path(root: str, year: int, game_type: str) -> str:
+    return join(root, f"Year={year}", f"gameType={game_type}")
+
+
+def write_feature_store(df: pd.DataFrame, root: str = FEATURE_STORE):
+    # Réécrit les partitions présentes dans df, les autres partitions restent intactes
+    df = compact_dtypes(df)
+
+    for (year, game_type), df_partition in df.groupby(PARTITION_COLUMNS, sort=False, observed=True):
+        path_directory = partition_path(root, year, game_type)
+        if os.path.exists(path_directory):
+            shutil.rmtree(path_directory)
+        os.makedirs(path_directory)
+        df_partition.to_parquet(join(path_directory, "part-0.parquet"), index=False)
+
+
+def save_clean_data(regular_season: dict, playoff: dict, root: str = FEATURE_STORE):
+    # Sortie de data_clean -> magasin de caractéristiques, assemblée et écrite une saison à la fois
+    for year in regular_season:
+        write_feature_store(dic_to_df(regular_season, playoff, [year]), root)
+
+
+def csv_to_feature_store(csv_path: str, root: str = FEATURE_STORE):
+    # Conversion d'un ancien export (ex. data/dataframe_2016_to_2019.csv)
+    write_feature_store(pd.read_csv(csv_path), root)
+
+
+def load_builds(path_directory: str) -> dict:
+    path = join(path_directory, BUILDS_FILE)
+    if not isfile(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+
+def save_builds(path_directory: str, builds: dict):
+    path = join(path_directory, BUILDS_FILE)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        json.dump(builds, file, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def read_partition(path_directory: str, columns: list = None) -> pd.DataFrame:
+    builds = load_builds(path_directory)
+    paths = sorted(glob.glob(join(path_directory, "*.parquet")))
+    if builds is None:
+        return pd.concat([pd.read_parquet(path, columns=columns) for path in paths], ignore_index=True)
+
+    # Partition incrémentale : on ne garde, dans chaque fichier, que les matchs dont c'est la version courante
+    read_columns = columns if columns is None or 'idGame' in columns else list(columns) + ['idGame']
+    frames = []
+    for path in paths:
+        part = basename(path)
+        live = [int(game_id) for game_id, build in builds['games'].items() if build['part'] == part]
+        if not live:
+            continue
+        df = pd.read_parquet(path, columns=read_columns)
+        frames.append(df[df['idGame'].isin(live)])
+
+    if not frames:
+        return pd.DataFrame(columns=columns)
+
+    df = pd.concat(frames, ignore_index=True)
+    if not df['idGame'].is_monotonic_increasing:
+        # Les matchs recalculés sont dans des fichiers plus récents (ou à la fin du fichier compacté) :
+        # on remet l'ordre des matchs
+        df = df.sort_values('idGame', kind='stable', ignore_index=True)
+    return df if read_columns is columns else df.drop(columns='idGame')
+
+
+def compact_partition(path_directory: str, builds: dict, part: str):
+    # Toutes les lignes courantes de la partition dans un seul fichier, recopiées un fichier à la fois :
+    # la mémoire utilisée est celle du plus gros fichier, pas celle de la partition
+    live = {}
+    for game_id, build in builds['games'].items():
+        live.setdefault(build['part'], []).append(int(game_id))
+    paths = [path for path in sorted(glob.glob(join(path_directory, "*.parquet"))) if basename(path) in live]
+
+    # Les catégories (dictionnaires) et les colonnes vides diffèrent d'un lot à l'autre : schéma commun
+    schema = pa.unify_schemas([pq.read_schema(path).remove_metadata() for path in paths],
+                              promote_options='permissive')
+    with pq.ParquetWriter(join(path_directory, part), schema) as writer:
+        for path in paths:
+            table = pq.read_table(path)
+            table = table.filter(pc.is_in(table['idGame'], value_set=pa.array(live[basename(path)],
+                                                                              table['idGame'].type)))
+            writer.write_table(table.replace_schema_metadata(None).cast(schema))
+            del table
+
+
+def update_feature_store(raw_data: NHLData, first_year: int, last_year: int, root: str = FEATURE_STORE,
+                         max_parts: int = 8, chunk_size: int = None, dimensions: Dimensions = None) -> dict:
+    # Reconstruction incrémentale : seuls les matchs dont le contenu brut (hash du manifeste) ou
+    # FEATURE_VERSION a changé sont recalculés. Leurs lignes sont écrites dans un nouveau fichier
+    # de la partition, les anciennes lignes sont ignorées à la lecture puis supprimées au compactage.
+    # chunk_size : nombre maximal de matchs nettoyés à la fois ; l'état est sauvegardé après chaque
+    # lot, un arrêt en cours de saison reprend donc au lot suivant.
+    # Les tirs sont écrits avec les identifiants (eventOwnerTeamId, shootingPlayerId, goalieId) ;
+    # dimensions (data/dimensions.json par défaut) est tenu à jour et donne les noms à la lecture.
+    if dimensions is None:
+        dimensions = Dimensions()
+    # Table absente (ex. supprimée) : elle est reconstruite aussi à partir des matchs inchangés
+    refill_dimensions = not dimensions.players
+    stats = {'games': 0, 'rebuilt': 0, 'removed': 0, 'partitions_written': 0}
+
+    for year in range(first_year, last_year + 1):
+        for game_type in GAME_TYPES:
+            type_code, label = GAME_TYPE_LABELS[game_type]
+            path_directory = partition_path(root, year, label)
+            builds = load_builds(path_directory) or {'next_part': 0, 'games': {}}
+
+            index = {str(int(f"{year}{type_code}{game}")): (game, entry)
+                     for game, entry in raw_data.game_index(year, game_type)}
+            changed = [game_id for game_id, (_, entry) in index.items()
+                       if builds['games'].get(game_id, {}).get('hash') != entry['hash']
+                       or builds['games'][game_id]['version'] != FEATURE_VERSION]
+            removed = [game_id for game_id in builds['games'] if game_id not in index]
+            stats['games'] += len(index)
+            stats['rebuilt'] += len(changed)
+            stats['removed'] += len(removed)
+            if refill_dimensions:
+                for game_id in set(index) - set(changed):
+                    dimensions.update(raw_data.read_game(year, game_type, *index[game_id]))
+                dimensions.save()
+            if not changed and not removed:
+                continue
+
+            if not builds['next_part'] and os.path.exists(path_directory):
+                # Partition écrite en entier par write_feature_store : elle est remplacée
+                shutil.rmtree(path_directory)
+            os.makedirs(path_directory, exist_ok=True)
+
+            for game_id in removed:
+                del builds['games'][game_id]
+
+            size = chunk_size or max(len(changed), 1)
+            for start in range(0, len(changed), size):
+                chunk = changed[start:start + size]
+                df = df_convert_season((raw_data.read_game(year, game_type, *index[game_id]) for game_id in chunk),
+                                       dimensions, names=False)
+                df.insert(0, 'Year', year)
+                df.insert(2, 'gameType', label)
+
+                part = f"part-{builds['next_part']}.parquet"
+                df.to_parquet(join(path_directory, part), index=False)
+                del df
+                # Noms sauvegardés avant les lignes qui les référencent
+                dimensions.save()
+                builds['next_part'] += 1
+                for game_id in chunk:
+                    builds['games'][game_id] = {'hash': index[game_id][1]['hash'], 'version': FEATURE_VERSION,
+                                                'part': part}
+                save_builds(path_directory, builds)
+
+            live_parts = {build['part'] for build in builds['games'].values()}
+            if len(live_parts) > max_parts:
+                part = f"part-{builds['next_part']}.parquet"
+                compact_partition(path_directory, builds, part)
+                builds['next_part'] += 1
+                for build in builds['games'].values():
+                    build['part'] = part
+                live_parts = {part}
+
+            save_builds(path_directory, builds)
+            stats['partitions_written'] += 1
+
+            # Fichiers dont aucune ligne n'est encore utilisée
+            for path in glob.glob(join(path_directory, "*.parquet")):
+                if basename(path) not in live_parts:
+                    os.remove(path)
+
+    print(f"{stats['rebuilt']} / {stats['games']} games rebuilt, {stats['removed']} removed, "
+          f"{stats['partitions_written']} partitions written")
+    return stats
+
+
+def build_dataset(first_year: int, last_year: int, root: str = FEATURE_STORE, chunk_memory_mb: float = 1024,
+                  raw_data: NHLData = None, dimensions: Dimensions = None) -> dict:
+    # Remplace data_extract + data_clean + dic_to_df pour de nombreuses saisons : les matchs sont lus
+    # un à un depuis le cache (téléchargés au besoin), nettoyés par lots et écrits directement dans
+    # le magasin. Relancer la même commande après une interruption reprend la construction.
+    # chunk_memory_mb : mémoire de travail visée pour le nettoyage d'un lot (estimée par match avec
+    # CLEANING_MB_PER_GAME), pas un plafond du processus : l'interpréteur et les bibliothèques
+    # (~150-200 Mo) s'y ajoutent. Le compactage des partitions recopie un fichier à la fois.
+    if raw_data is None:
+        raw_data = NHLData(projection="cleaning")
+    chunk_size = max(1, int(chunk_memory_mb / CLEANING_MB_PER_GAME))
+    return update_feature_store(raw_data, first_year, last_year, root, chunk_size=chunk_size, dimensions=dimensions)
+
+
+def list_partitions(root: str = FEATURE_STORE) -> list:
+    partitions = []
+    for path_directory in sorted(glob.glob(join(root, "Year=*", "gameType=*"))):
+        year = int(basename(dirname(path_directory)).split('=', 1)[1])
+        game_type = basename(path_directory).split('=', 1)[1]
+        partitions.append((year, game_type, path_directory))
+    # Même ordre que dic_to_df : saison régulière puis séries, année par année
+    return sorted(partitions, key=lambda partition: (partition[0], partition[1] != 'regular-season', partition[1]))
+
+
+def load_feature_store(columns: list = None, years: list = None, game_types: list = None,
+                       root: str = FEATURE_STORE, names: bool = True, dimensions: Dimensions = None) -> pd.DataFrame:
+    # Seules les partitions demandées sont ouvertes et seules les colonnes demandées sont lues.
+    # Partitions construites par update_feature_store (identifiants) : names=True remplace les
+    # identifiants par les noms de dimensions (data/dimensions.json par défaut), names=False les garde.
+    # Les partitions écrites par write_feature_store contiennent déjà les noms.
+    name_columns = {name_column: id_column for id_column, name_column in ID_COLUMNS.items()}
+    frames = []
+    for year, game_type, path_directory in list_partitions(root):
+        if years is not None and year not in years:
+            continue
+        if game_types is not None and game_type not in game_types:
+            continue
+
+        paths = sorted(glob.glob(join(path_directory, "*.parquet")))
+        stored = pq.read_schema(paths[0]).names if paths else []
+        read_columns = columns
+        if columns is not None:
+            read_columns = [name_columns[column] if column in name_columns and name_columns[column] in stored
+                            else column for column in columns]
+        df = read_partition(path_directory, read_columns)
+        if names and any(id_column in df.columns for id_column in ID_COLUMNS):
+            if dimensions is None:
+                dimensions = Dimensions()
+            df = dimensions.resolve(df)
+        frames.append(df)
+
+    if not frames:
+        raise FileNotFoundError(f"No partition matching years={years}, game_types={game_types} in {root}")
+
+    return compact_dtypes(pd.concat(frames, ignore_index=True))
+
+
+if __name__ == "__main__":
+    # python -m ift6758.data.store 2010 2024 [mémoire de travail d'un lot en Mo]
+    build_dataset(int(sys.argv[1]), int(sys.argv[2]),
+                  chunk_memory_mb=float(sys.argv[3]) if len(sys.argv) > 3 else 1024)
@@ -1,29 +1,82 @@
+import numpy as np
 import pandas as pd
 
+SITUATION_COLUMNS = ['awayGoalie', 'awaySkaters', 'homeSkaters', 'homeGoalie']
 
-def empty_goal_func(df: pd.DataFrame) -> pd.Series:
-    return df.apply(lambda x: x['situationCode'][3] if x['teamSide'] == 'away' else x['situationCode'][0] if len(x['situationCode']) == 4 else 0
-                    , axis=1).map(
-        {'0': True, '1': False})
+# Types compacts des colonnes nettoyées : catégories pour les chaînes répétées,
+# petits entiers et float32 (coordonnées au pied près, angles et distances au centième)
+FEATURE_DTYPES = {
+    'Year': 'int64', 'idGame': 'int32', 'numberPeriod': 'int8', 'gameSeconds': 'int32',
+    'eventOwnerTeamId': 'int32', 'shootingPlayerId': 'int32', 'goalieId': 'int32',
+    'emptyGoalNet': 'int8', 'isGoal': 'int8',
+    'timeSinceLastEvent': 'float32', 'previousXCoord': 'float32', 'previousYCoord': 'float32',
+    'xCoord': 'float32', 'yCoord': 'float32', 'shotDistance': 'float32', 'distanceFromLastEvent': 'float32',
+    'speedFromLastEvent': 'float32', 'shotAngle': 'float32', 'reboundAngleShot': 'float32',
+    'offensivePressureTime': 'float32',
+    'gameType': 'category', 'periodType': 'category', 'typeDescKey': 'category', 'eventOwnerTeam': 'category',
+    'previousEventType': 'category', 'zoneShoot': 'category', 'shootingPlayer': 'category',
+    'goaliePlayer': 'category', 'shotType': 'category', 'teamSide': 'category', 'isGoalAdvantage': 'category',
+}
 
 
-def goal_situation(df: pd.DataFrame) -> pd.Series:
-    return df.apply(lambda x: "Advantage" if (int(x['situationCode'][1]) > int(x['situationCode'][2]) and x[
-        'teamSide'] == 'away') or (int(x['situationCode'][2]) > int(x['situationCode'][1]) and x[
-        'teamSide'] == 'home')
-    else "Disadvantage" if (int(x['situationCode'][1]) < int(x['situationCode'][2]) and x['teamSide'] == 'away') or
-                           (int(x['situationCode'][2]) < int(x['situationCode'][1]) and x['teamSide'] == 'home')
-    else 'Neutral', axis=1)
+def situation_code(df: pd.DataFrame) -> pd.DataFrame:
+    # situationCode "1551" -> gardien visiteur, patineurs visiteurs, patineurs locaux, gardien local
+    # Les chaînes sont vues comme des tableaux de caractères UTF-32 : un seul passage vectorisé
+    # Code absent (NaN -> "nan"), trop court ou trop long : erreur plutôt que des chiffres inventés
+    codes = np.asarray(df['situationCode'].astype(str), dtype=str)
+    invalid = np.char.str_len(codes) != 4
+    codes = codes.astype('U4')
+    digits = codes.view(np.uint32).reshape(len(codes), 4).astype(np.int64) - ord('0')
+    invalid |= ((digits < 0) | (digits > 9)).any(axis=1)
+    if invalid.any():
+        raise ValueError(f"Invalid situationCode: {sorted(set(df['situationCode'][invalid].astype(str)))[:5]}")
+    return pd.DataFrame(digits, columns=SITUATION_COLUMNS, index=df.index)
+
+
+def compact_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    # À réappliquer après un pd.concat : des catégories différentes d'un match à l'autre redonnent des objets
+    dtypes = {column: dtype for column, dtype in FEATURE_DTYPES.items()
+              if column in df.columns and df[column].dtype != dtype}
+    if 'xCoord' in dtypes or 'yCoord' in dtypes:
+        df = df.copy()
+        for column in ('xCoord', 'yCoord'):
+            if column in dtypes:
+                df[column] = pd.to_numeric(df[column], errors='coerce')
+    return df.astype(dtypes) if dtypes else df
+
+
+def memory_per_million_shots(df: pd.DataFrame) -> float:
+    # Mémoire occupée (Mo) ramenée à un million de tirs, soit des octets par tir
+    return df.memory_usage(deep=True).sum() / max(len(df), 1)
+
+
+def empty_goal_func(df: pd.DataFrame, situation: pd.DataFrame = None) -> pd.Series:
+    if situation is None:
+        situation = situation_code(df)
+    # Filet du gardien adverse
+    goalie = np.where(df['teamSide'] == 'away', situation['homeGoalie'], situation['awayGoalie'])
+    return pd.Series(goalie == 0, index=df.index)
+
+
+def goal_situation(df: pd.DataFrame, situation: pd.DataFrame = None) -> pd.Series:
+    if situation is None:
+        situation = situation_code(df)
+    away = (df['teamSide'] == 'away').to_numpy()
+    home = (df['teamSide'] == 'home').to_numpy()
+    away_skaters = situation['awaySkaters'].to_numpy()
+    home_skaters = situation['homeSkaters'].to_numpy()
+
+    advantage = (away & (away_skaters > home_skaters)) | (home & (home_skaters > away_skaters))
+    disadvantage = (away & (away_skaters < home_skaters)) | (home & (home_skaters < away_skaters))
+    return pd.Series(np.select([advantage, disadvantage], ["Advantage", "Disadvantage"], "Neutral"),
+                     index=df.index, dtype=object)
 
 
 def time_convert(df: pd.DataFrame, column: str) -> pd.Series:
 
-    df['minutes'] = df[column].str.split(':').str[0].astype(int)
-    df['seconds'] = df[column].str.split(':').str[1].astype(int)
+    clock = df[column].str.split(':', n=1, expand=True).astype(int)
     df['numberPeriod'] = df['numberPeriod'].astype(int)
 
-    df[column] = df['minutes'] * 60 + df['seconds'] + 20 * 60 * (df['numberPeriod'] - 1)
-
-    df.drop(['minutes', 'seconds'], axis=1, inplace=True)
+    df[column] = clock[0] * 60 + clock[1] + 20 * 60 * (df['numberPeriod'] - 1)
 
     return df[column]
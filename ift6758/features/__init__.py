@@ -1,2 +1,5 @@
+from ift6758.features.manifest import *
+from ift6758.features.scheduler import *
+from ift6758.features.storage import *
 from ift6758.features.play_by_play import *
 from ift6758.features.excdata import *
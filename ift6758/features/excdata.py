@@ -1,8 +1,8 @@
 from ift6758.features.play_by_play import NHLData
 
 
-def data_extract(first_year: int, last_year: int) -> NHLData:
-    raw_data = NHLData()  # Initialize the data object
+def data_extract(first_year: int, last_year: int, workers: int = 1) -> NHLData:
+    raw_data = NHLData(workers=workers)  # Initialize the data object
 
     # Loop over all years
     for year in range(first_year, last_year + 1):
@@ -0,0 +1,165 @@
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Faux serveur de l'API play-by-play, en local, qui injecte des pannes pour vérifier FetchScheduler et
+# NHLData sans réseau : python -m ift6758.features.faultserver [taux de pannes]
+#   503       : erreur serveur
+#   429       : limite de débit, avec Retry-After
+#   reset     : connexion fermée sans réponse
+#   truncated : Content-Length complet mais corps coupé (lecture interrompue)
+#   invalid   : réponse 200 dont le JSON est tronqué
+#   slow      : réponse plus lente que le timeout du client
+FAULTS = ('503', '429', 'reset', 'truncated', 'invalid', 'slow')
+
+# Matchs servis : saison régulière 0001..n_regular, séries {(ronde, série): nombre de matchs}
+REGULAR_GAMES = 40
+PLAYOFF_SERIES = {(1, 1): 4, (1, 2): 7, (2, 1): 5, (3, 1): 6, (4, 1): 4}
+
+
+def fake_game(game_id: int, nb_plays: int = 60) -> dict:
+    # Document minimal mais complet pour le nettoyage, identique pour un même match
+    generator = random.Random(game_id)
+    home, away = 1 + generator.randint(0, 15), 20 + generator.randint(0, 15)
+    roster = [{'teamId': team, 'playerId': team * 100 + number, 'firstName': {'default': f"P{number}"},
+               'lastName': {'default': f"T{team}"}} for team in (home, away) for number in range(20)]
+    plays = []
+    for index in range(nb_plays):
+        period = 1 + index * 3 // nb_plays
+        seconds = generator.randint(0, 1199)
+        owner = home if generator.random() < 0.5 else away
+        play_type = generator.choice(['faceoff', 'hit', 'shot-on-goal', 'goal', 'missed-shot', 'stoppage'])
+        details = {'xCoord': generator.randint(-99, 99), 'yCoord': generator.randint(-42, 42),
+                   'zoneCode': generator.choice('ODN'), 'eventOwnerTeamId': owner}
+        if play_type in ('shot-on-goal', 'goal'):
+            details['shotType'] = generator.choice(['wrist', 'snap', 'slap'])
+            details['scoringPlayerId' if play_type == 'goal' else 'shootingPlayerId'] = owner * 100
+            details['goalieInNetId'] = (away if owner == home else home) * 100 + 19
+        plays.append({'periodDescriptor': {'number': period, 'periodType': 'REG'},
+                      'timeInPeriod': f"{seconds // 60:02d}:{seconds % 60:02d}", 'situationCode': '1551',
+                      'typeDescKey': play_type, 'details': details})
+    return {'id': game_id, 'gameState': 'OFF',
+            'homeTeam': {'id': home, 'name': {'default': f"Team {home}"}},
+            'awayTeam': {'id': away, 'name': {'default': f"Team {away}"}},
+            'rosterSpots': roster, 'plays': plays}
+
+
+def game_exists(game_type: str, game: str) -> bool:
+    if game_type == '02':
+        return 1 <= int(game) <= REGULAR_GAMES
+    if game_type == '03':
+        return 1 <= int(game[3]) <= PLAYOFF_SERIES.get((int(game[1]), int(game[2])), 0)
+    return False
+
+
+class FaultHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    fault_rate = 0.0
+    slow_seconds = 1.5
+    faults = {}
+    lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        # /v1/gamecenter/{année}{type}{match}/play-by-play
+        game_id = self.path.rstrip('/').split('/')[-2]
+        fault = random.choice(FAULTS) if random.random() < self.fault_rate else None
+        with self.lock:
+            self.faults[fault] = self.faults.get(fault, 0) + 1
+
+        if fault == 'reset':
+            self.close_connection = True
+            return
+        if fault == 'slow':
+            time.sleep(self.slow_seconds)
+        if fault in ('503', '429'):
+            self.send_body(int(fault), b'{}', {'Retry-After': '0'} if fault == '429' else {})
+            return
+
+        if not (game_id.isdigit() and len(game_id) == 10 and game_exists(game_id[4:6], game_id[6:])):
+            self.send_body(404, b'{}')
+            return
+
+        body = json.dumps(fake_game(int(game_id))).encode('utf-8')
+        if fault == 'invalid':
+            self.send_body(200, body[:len(body) // 2])
+        elif fault == 'truncated':
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body[:len(body) // 2])
+            self.close_connection = True
+        else:
+            self.send_body(200, body)
+
+    def send_body(self, status: int, body: bytes, headers: dict = None):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class FaultServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Client parti avant la fin d'une réponse lente : attendu, rien à signaler
+        pass
+
+
+def start_fault_server(fault_rate: float = 0.3, port: int = 0) -> tuple:
+    # Retourne (serveur, base_url à passer à NHLData) ; le serveur tourne dans un thread
+    handler = type('Handler', (FaultHandler,), {'fault_rate': fault_rate, 'faults': {}})
+    server = FaultServer(('127.0.0.1', port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1/gamecenter"
+
+
+def check_sync(fault_rate: float = 0.3, year: str = "2020") -> dict:
+    # Télécharge une saison complète à travers les pannes, en série puis en parallèle,
+    # et vérifie que chaque match reçu est exactement celui servi
+    from ift6758.features.play_by_play import NHLData
+    from ift6758.features.scheduler import FetchScheduler
+
+    server, base_url = start_fault_server(fault_rate)
+    expected_playoffs = sum(PLAYOFF_SERIES.values())
+    cwd = os.getcwd()
+    try:
+        for workers in (1, 4):
+            with tempfile.TemporaryDirectory() as directory:
+                # NHLData écrit son cache dans data/ du répertoire courant
+                os.chdir(directory)
+                scheduler = FetchScheduler(max_concurrency=workers, rate=None, max_retries=10, backoff=0.01,
+                                           max_backoff=0.05, failure_threshold=1000, timeout=1)
+                nhl_data = NHLData(workers=workers, base_url=base_url, scheduler=scheduler)
+                regular = list(nhl_data.iter_games(year, "regular_season"))
+                playoffs = list(nhl_data.iter_games(year, "playoffs"))
+                os.chdir(cwd)
+
+            assert len(regular) == REGULAR_GAMES, f"{len(regular)} regular season games"
+            assert len(playoffs) == expected_playoffs, f"{len(playoffs)} playoff games"
+            for data in regular + playoffs:
+                assert data == fake_game(data['id']), f"game {data['id']} differs from the served document"
+            print(f"workers={workers}: {len(regular)} + {len(playoffs)} games, {scheduler.counters}")
+    finally:
+        os.chdir(cwd)
+        server.shutdown()
+
+    faults = server.RequestHandlerClass.faults
+    print(f"Faults injected: { {fault: count for fault, count in faults.items() if fault is not None} }")
+    return faults
+
+
+if __name__ == "__main__":
+    check_sync(float(sys.argv[1]) if len(sys.argv) > 1 else 0.3)
@@ -0,0 +1,88 @@
+import json
+import os
+from datetime import datetime, timezone
+from os.path import join, isfile
+
+# États d'un match dans l'API qui ne changeront plus
+FINAL_STATES = ('FINAL', 'OFF')
+
+
+class SeasonManifest:
+    filename = "manifest.json"
+
+    def __init__(self, path_directory: str):
+        self.path = join(path_directory, self.filename)
+        self.complete = False
+        self.games = {}
+        self.nb_changes = 0
+
+        if isfile(self.path):
+            with open(self.path, 'r', encoding='utf-8') as file:
+                manifest = json.load(file)
+            self.complete = manifest['complete']
+            self.games = manifest['games']
+
+    def is_fresh(self, game: str, storage) -> bool:
+        # Le cache local est à jour : match terminé et données intactes
+        entry = self.games.get(game)
+        if entry is None or entry['status'] != 'ok' or not entry['final']:
+            return False
+        return storage.is_intact(game, entry)
+
+    def is_missing(self, game: str) -> bool:
+        # Une fois la saison complète, tout match non répertorié n'existe pas
+        return self.complete and self.games.get(game, {}).get('status') != 'ok'
+
+    def is_known(self, game: str) -> bool:
+        return game in self.games
+
+    def is_final(self, game: str) -> bool:
+        entry = self.games.get(game, {})
+        return entry.get('status') == 'ok' and entry['final']
+
+    def status(self, game: str) -> str:
+        return self.games.get(game, {}).get('status')
+
+    def known_games(self) -> list:
+        return sorted(game for game, entry in self.games.items() if entry['status'] == 'ok')
+
+    @staticmethod
+    def entry(stored: dict, data: dict) -> dict:
+        # stored : empreinte et emplacement renvoyés par le stockage (hash, size, offset...)
+        return {'status': 'ok',
+                **stored,
+                'final': data.get('gameState', 'OFF') in FINAL_STATES,
+                'updated': datetime.now(timezone.utc).isoformat(timespec='seconds')}
+
+    @staticmethod
+    def missing_entry(status_code: int) -> dict:
+        # 404 : le match n'existe pas ; autre code : erreur à réessayer
+        return {'status': 'missing' if status_code == 404 else 'error',
+                'code': status_code,
+                'updated': datetime.now(timezone.utc).isoformat(timespec='seconds')}
+
+    def record(self, game: str, entry: dict):
+        if entry is None:
+            return
+        self.games[game] = entry
+        self.nb_changes += 1
+        # Sauvegarde régulière pour pouvoir reprendre après un crash
+        if self.nb_changes % 50 == 0:
+            self.save(self.complete)
+
+    def save(self, complete: bool):
+        # La saison n'est complète que si tous ses matchs sont terminés
+        was_complete = self.complete
+        self.complete = complete and all(entry['final'] for entry in self.games.values()
+                                         if entry['status'] == 'ok')
+        if not self.nb_changes and was_complete == self.complete and isfile(self.path):
+            return
+
+        manifest = {'complete': self.complete,
+                    'updated': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                    'games': self.games}
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(manifest, file, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+        self.nb_changes = 0
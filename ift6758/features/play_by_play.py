@@ -1,104 +1,205 @@
-import json
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from os import makedirs
-from os.path import join, isfile, exists
+from os.path import exists
 
 import requests
+from requests.adapters import HTTPAdapter
+
+from ift6758.features.manifest import SeasonManifest
+from ift6758.features.scheduler import FetchScheduler
+from ift6758.features.storage import GameFiles, SeasonArchive, PROJECTIONS, project
+
+# Nombre de matchs par série (round -> nombre de séries)
+PLAYOFF_ROUNDS = {1: 8, 2: 4, 3: 2, 4: 1}
+PLAYOFF_MAX_GAMES = 7
+
+
+def decode_game(response: requests.Response) -> dict:
+    # ValueError si le corps n'est pas un document de match complet
+    data = response.json()
+    if not isinstance(data, dict) or 'id' not in data or not isinstance(data.get('plays'), list):
+        raise ValueError("Incomplete play-by-play document")
+    return data
 
 
 class NHLData:
-    def __init__(self):
+    base_url = "https://api-web.nhle.com/v1/gamecenter"
+
+    def __init__(self, workers: int = 1, base_url: str = None, timeout: float = 30, storage: str = "archive",
+                 projection: str = None, scheduler: FetchScheduler = None):
         self.playoffs = {}
-        self.regular_season = {} 
+        self.regular_season = {}
 
-    def get_regular_saison(self, year: str):
+        # workers > 1 active le téléchargement concurrent avec une session partagée
+        self.workers = workers
+        self.timeout = timeout
+        if base_url is not None:
+            self.base_url = base_url
+        self.session = None
 
-        path_directory = f"data/regular_season/{year}"
+        # Nouvelles tentatives, limitation de débit et disjoncteur pour les appels à l'API
+        self.scheduler = scheduler if scheduler is not None else FetchScheduler(max_concurrency=max(workers, 1),
+                                                                                timeout=timeout)
 
-        
-        if not exists(path_directory):
-            makedirs(path_directory)
+        # "archive" : une archive compressée par saison, "json" : un fichier JSON par match
+        self.storage = storage
 
-        game = "0001"  
-        games_list = []
-        nb_data = 0  
+        # projection="cleaning" : ne charge que les champs utiles au nettoyage, depuis un cache allégé
+        if projection is not None and projection not in PROJECTIONS:
+            raise ValueError(f"Unknown projection: {projection}")
+        self.projection = projection
 
-        while True:
+    def get_regular_saison(self, year: str):
+        self.regular_season[year] = self.load_season(year, "regular_season")
 
-            local_file = join(path_directory, f"{year}_{game}.json")
+    def get_playoff(self, year: str):
+        self.playoffs[year] = self.load_season(year, "playoffs")
+
+    def load_season(self, year: str, game_type: str = "regular_season", workers: int = None) -> list:
+        # Cache à jour : lecture et décodage des matchs en parallèle, dans l'ordre des matchs.
+        # Sinon, on synchronise la saison avec iter_games.
+        path_directory = f"data/{game_type}/{year}"
+        manifest = SeasonManifest(path_directory)
+        storage = self.__get_storage(path_directory, year)
+        slim = self.__get_projection_storage(path_directory, year)
+
+        games = manifest.known_games()
+        if not manifest.complete or not all(manifest.is_fresh(game, storage) for game in games):
+            return list(self.iter_games(year, game_type))
+
+        # L'URL ne sert que si un match du cache ne correspond plus au manifeste
+        type_code = "02" if game_type == "regular_season" else "03"
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(
+                lambda game: self.__get_game(f"{self.base_url}/{year}{type_code}{game}/play-by-play", game,
+                                             manifest, storage, slim), games))
+
+        for game, (_, entry, _) in zip(games, results):
+            manifest.record(game, entry)
+        manifest.save(manifest.complete)
+
+        return [data for data, _, _ in results]
+
+    def game_index(self, year: str, game_type: str = "regular_season") -> list:
+        # Synchronise la saison si besoin et retourne [(match, entrée du manifeste)] dans l'ordre,
+        # de quoi relire chaque match indépendamment avec read_game (ex. depuis un autre processus)
+        path_directory = f"data/{game_type}/{year}"
+        storage = self.__get_storage(path_directory, year)
+        slim = self.__get_projection_storage(path_directory, year)
+
+        manifest = SeasonManifest(path_directory)
+        if not self.__is_warm(manifest, storage, slim):
+            for _ in self.iter_games(year, game_type):
+                pass
+            manifest = SeasonManifest(path_directory)
+
+        return [(game, manifest.games[game]) for game in manifest.known_games()]
+
+    def read_game(self, year: str, game_type: str, game: str, entry: dict) -> dict:
+        # Lecture directe d'un match du cache, sans réseau ni mise à jour du manifeste
+        path_directory = f"data/{game_type}/{year}"
+        slim = self.__get_projection_storage(path_directory, year)
+        if slim is not None:
+            slim_entry = entry.get('projections', {}).get(self.projection)
+            if slim_entry is not None:
+                return slim.read(game, slim_entry)
+            return project(self.__get_storage(path_directory, year).read(game, entry), PROJECTIONS[self.projection])
+        return self.__get_storage(path_directory, year).read(game, entry)
+
+    def iter_games(self, year: str, game_type: str = "regular_season"):
+        # Parcourt les matchs d'une saison un à un (cache local ou API) sans les garder en mémoire
+        if game_type == "regular_season":
+            if self.workers > 1:
+                return self.__iter_regular_saison_concurrent(year)
+            return self.__iter_regular_saison(year)
+        if game_type == "playoffs":
+            if self.workers > 1:
+                return self.__iter_playoff_concurrent(year)
+            return self.__iter_playoff(year)
+        raise ValueError(f"Unknown game type: {game_type}")
+
+    def __iter_regular_saison(self, year: str):
 
-            url = f"https://api-web.nhle.com/v1/gamecenter/{year}02{game}/play-by-play"
+        path_directory = f"data/regular_season/{year}"
+
+
+        if not exists(path_directory):
+            makedirs(path_directory)
 
-            if not isfile(local_file):
+        manifest = SeasonManifest(path_directory)
+        storage = self.__get_storage(path_directory, year)
+        slim = self.__get_projection_storage(path_directory, year)
 
-                response = requests.get(url)
+        game = "0001"
+        complete = None
 
-                if response.status_code == 200:
+        try:
+            while True:
 
-                    data = response.json()
+                url = f"{self.base_url}/{year}02{game}/play-by-play"
 
-                    with open(local_file, 'w', encoding='utf-8') as file:
-                        json.dump(data, file, ensure_ascii=False, indent=4)  
-                    print(f"Data was successfully imported: {local_file}")
+                data, entry, downloaded = self.__get_game(url, game, manifest, storage, slim)
+                manifest.record(game, entry)
 
-                
-                else:
+                if data is None:
                     break
-            else:
-                
-                with open(local_file, 'r', encoding='utf-8') as file:
-                    data = json.load(file)
 
-            nb_data += 1   
-            games_list.append(data) 
-            game = f"{int(game) + 1:04d}"  
+                if downloaded:
+                    print(f"Data was successfully imported: {path_directory}/{year}_{game}")
 
-        self.regular_season[year] = games_list
+                yield data
+                game = f"{int(game) + 1:04d}"
 
-    def get_playoff(self, year: str):
+            complete = manifest.status(game) != 'error'
+        finally:
+            # Un parcours interrompu ne modifie pas l'état "complet" de la saison
+            manifest.save(manifest.complete if complete is None else complete)
+
+    def __iter_playoff(self, year: str):
         path_directory = f"data/playoffs/{year}"
 
         if not exists(path_directory):
             makedirs(path_directory)
 
-        game = "0111" 
-        games_list = []  
-        nb_data = 0  
-
-        while int(game[1]) < 5:
+        manifest = SeasonManifest(path_directory)
+        storage = self.__get_storage(path_directory, year)
+        slim = self.__get_projection_storage(path_directory, year)
 
-            local_file = join(path_directory, f"{year}_{game}.json")
+        game = "0111"
+        complete = True
+        finished = False
 
-            url = f"https://api-web.nhle.com/v1/gamecenter/{year}03{game}/play-by-play"
+        try:
+            while int(game[1]) < 5:
 
-            if not isfile(local_file):
+                url = f"{self.base_url}/{year}03{game}/play-by-play"
 
-                response = requests.get(url)
+                data, entry, downloaded = self.__get_game(url, game, manifest, storage, slim)
+                manifest.record(game, entry)
 
-                if response.status_code == 200:
+                if data is None:
+                    complete = complete and manifest.status(game) != 'error'
+                    game = self.__generate_playoff_id(game)
+                    continue
 
-                    data = response.json()
+                if downloaded:
+                    print(f"Data was successfully imported: {path_directory}/{year}_{game}")
 
-                    with open(local_file, 'w', encoding='utf-8') as file:
-                        json.dump(data, file, ensure_ascii=False, indent=4) 
-                        print(f"Data was successfully imported: {local_file}")
+                yield data
 
-                else:
-                    game = self.__generate_playoff_id(game) 
-                    continue  
+                game = f"{int(game) + 1:04d}"
 
-            with open(local_file, 'r', encoding='utf-8') as file:
-                data = json.load(file)
-                games_list.append(data) 
-                nb_data += 1  
-
-            game = f"{int(game) + 1:04d}"
-        self.playoffs[year] = games_list
+            finished = True
+        finally:
+            manifest.save(complete if finished else manifest.complete)
 
     def __generate_playoff_id(self, playoff_id: str) -> str:
 
-        prefix = playoff_id[0]  
-        round_digit = int(playoff_id[1])  
-        matchup_digit = int(playoff_id[2])  
+        prefix = playoff_id[0]
+        round_digit = int(playoff_id[1])
+        matchup_digit = int(playoff_id[2])
 
         game_digit = 1
         if (round_digit == 1 and matchup_digit < 8) or (round_digit == 2 and matchup_digit < 4) or (
@@ -108,7 +209,210 @@ class NHLData:
             round_digit += 1
             matchup_digit = 1
 
-        
+
         new_playoff_id = f"{prefix}{round_digit}{matchup_digit}{game_digit}"
 
         return new_playoff_id
+
+    def __get_session(self) -> requests.Session:
+        if self.session is None:
+            self.session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(self.workers, 1))
+            self.session.mount("http://", adapter)
+            self.session.mount("https://", adapter)
+        return self.session
+
+    def __get_storage(self, path_directory: str, year: str):
+        if self.storage == "json":
+            return GameFiles(path_directory, year)
+        return SeasonArchive(path_directory, year)
+
+    def __is_warm(self, manifest: SeasonManifest, storage, slim) -> bool:
+        # Saison complète et tous ses matchs (et leur projection) intacts dans le cache
+        if not manifest.complete:
+            return False
+        for game in manifest.known_games():
+            if not manifest.is_fresh(game, storage):
+                return False
+            slim_entry = manifest.games[game].get('projections', {}).get(self.projection)
+            if slim is not None and (slim_entry is None or not slim.is_intact(game, slim_entry)):
+                return False
+        return True
+
+    def __get_projection_storage(self, path_directory: str, year: str):
+        if self.projection is None:
+            return None
+        return SeasonArchive(path_directory, year, filename=f"games.{self.projection}.pbpz")
+
+    def __get_game(self, url: str, game: str, manifest: SeasonManifest, storage, slim) -> tuple:
+        # Retourne (data, entrée du manifeste à enregistrer, téléchargé)
+        # data vaut None si le match n'existe pas
+
+        if slim is not None and manifest.is_fresh(game, storage):
+            slim_entry = manifest.games[game].get('projections', {}).get(self.projection)
+            if slim_entry is not None and slim.is_intact(game, slim_entry):
+                try:
+                    return slim.read(game, slim_entry), None, False
+                except ValueError:
+                    # Bloc périmé ou corrompu : la projection est recalculée
+                    pass
+
+        data, entry, downloaded = self.__get_raw_game(url, game, manifest, storage)
+        if slim is None or data is None:
+            return data, entry, downloaded
+
+        # Première lecture avec cette projection : on l'ajoute au cache allégé
+        data = project(data, PROJECTIONS[self.projection])
+        entry = dict(entry or manifest.games[game])
+        entry['projections'] = {**entry.get('projections', {}), self.projection: slim.write(game, data)}
+        return data, entry, downloaded
+
+    def __get_raw_game(self, url: str, game: str, manifest: SeasonManifest, storage) -> tuple:
+
+        if manifest.is_fresh(game, storage):
+            try:
+                return storage.read(game, manifest.games[game]), None, False
+            except ValueError:
+                # Données ne correspondant plus au manifeste : relues ailleurs ou retéléchargées
+                pass
+
+        if manifest.is_missing(game):
+            return None, None, False
+
+        # Données présentes mais absentes du manifeste ou d'un autre format (ancien cache,
+        # crash, changement de stockage) : on les adopte
+        if not manifest.is_known(game) or manifest.is_final(game):
+            adopted = storage.adopt(game, manifest.games.get(game))
+            if adopted is not None:
+                data, stored = adopted
+                return data, SeasonManifest.entry(stored, data), False
+
+        # Le document est décodé dans la boucle de nouvelles tentatives : un corps tronqué est retenté
+        response, data = self.scheduler.get_decoded(self.__get_session(), url, decode=decode_game)
+        if response.status_code != 200:
+            return None, SeasonManifest.missing_entry(response.status_code), False
+
+        return data, SeasonManifest.entry(storage.write(game, data), data), True
+
+    def __iter_regular_saison_concurrent(self, year: str):
+        path_directory = f"data/regular_season/{year}"
+        if not exists(path_directory):
+            makedirs(path_directory)
+
+        manifest = SeasonManifest(path_directory)
+        storage = self.__get_storage(path_directory, year)
+        slim = self.__get_projection_storage(path_directory, year)
+
+        nb_downloaded = 0
+        complete = None
+        # Débit mesuré sur le temps de travail des threads (divisé par workers), pas sur la durée
+        # du parcours : le temps passé par l'appelant entre deux matchs (yield) n'y entre pas
+        fetch_time = 0.0
+        counters = dict(self.scheduler.counters)
+
+        # Fenêtre glissante : on garde 2 * workers requêtes en vol et on s'arrête au premier match manquant
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                pending = deque()
+                game = 1
+                try:
+                    while True:
+                        while len(pending) < 2 * self.workers:
+                            game_id = f"{game:04d}"
+                            url = f"{self.base_url}/{year}02{game_id}/play-by-play"
+                            future = executor.submit(self.__timed, self.__get_game, url, game_id, manifest,
+                                                     storage, slim)
+                            pending.append((game_id, future))
+                            game += 1
+
+                        game_id, future = pending.popleft()
+                        (data, entry, downloaded), elapsed = future.result()
+                        fetch_time += elapsed
+                        manifest.record(game_id, entry)
+                        if data is None:
+                            break
+
+                        nb_downloaded += downloaded
+                        yield data
+                finally:
+                    for _, future in pending:
+                        future.cancel()
+
+            complete = manifest.status(game_id) != 'error'
+        finally:
+            manifest.save(manifest.complete if complete is None else complete)
+
+        self.__report(f"regular_season/{year}", nb_downloaded, fetch_time / self.workers, counters)
+
+    def __iter_playoff_concurrent(self, year: str):
+        path_directory = f"data/playoffs/{year}"
+        if not exists(path_directory):
+            makedirs(path_directory)
+
+        manifest = SeasonManifest(path_directory)
+        storage = self.__get_storage(path_directory, year)
+        slim = self.__get_projection_storage(path_directory, year)
+
+        nb_downloaded = 0
+        complete = True
+        finished = False
+        # Débit mesuré sur le temps de travail des threads (divisé par workers), pas sur la durée
+        # du parcours : le temps passé par l'appelant entre deux matchs (yield) n'y entre pas
+        fetch_time = 0.0
+        counters = dict(self.scheduler.counters)
+
+        series_ids = [(round_digit, matchup_digit) for round_digit, nb_matchups in PLAYOFF_ROUNDS.items()
+                      for matchup_digit in range(1, nb_matchups + 1)]
+
+        # Les 7 matchs possibles de plusieurs séries sont demandés en parallèle,
+        # puis on garde pour chaque série les matchs consécutifs existants
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                pending = deque()
+                try:
+                    while series_ids or pending:
+                        while series_ids and len(pending) * PLAYOFF_MAX_GAMES < 2 * self.workers + PLAYOFF_MAX_GAMES:
+                            round_digit, matchup_digit = series_ids.pop(0)
+                            futures = []
+                            for game_digit in range(1, PLAYOFF_MAX_GAMES + 1):
+                                game = f"0{round_digit}{matchup_digit}{game_digit}"
+                                url = f"{self.base_url}/{year}03{game}/play-by-play"
+                                futures.append((game, executor.submit(self.__timed, self.__get_game, url, game,
+                                                                      manifest, storage, slim)))
+                            pending.append(futures)
+
+                        in_series = True
+                        for game, future in pending.popleft():
+                            (data, entry, downloaded), elapsed = future.result()
+                            fetch_time += elapsed
+                            manifest.record(game, entry)
+                            if data is None:
+                                complete = complete and (not in_series or manifest.status(game) != 'error')
+                                in_series = False
+                            if in_series:
+                                nb_downloaded += downloaded
+                                yield data
+                finally:
+                    for futures in pending:
+                        for _, future in futures:
+                            future.cancel()
+
+            finished = True
+        finally:
+            manifest.save(complete if finished else manifest.complete)
+
+        self.__report(f"playoffs/{year}", nb_downloaded, fetch_time / self.workers, counters)
+
+    @staticmethod
+    def __timed(function, *args) -> tuple:
+        start = time.perf_counter()
+        return function(*args), time.perf_counter() - start
+
+    def __report(self, name: str, nb_downloaded: int, elapsed: float, since: dict):
+        # since : compteurs du scheduler au début de la saison, seuls ceux de la saison sont affichés
+        if nb_downloaded:
+            counters = {counter: value - since[counter] for counter, value in self.scheduler.counters.items()}
+            print(f"{name}: {nb_downloaded} games downloaded in {elapsed:.1f}s "
+                  f"({nb_downloaded / elapsed:.1f} games/s), {counters['retries']} retries, "
+                  f"waited {counters['rate_limit_wait_s']:.1f}s (rate limit) / "
+                  f"{counters['backoff_wait_s']:.1f}s (backoff)")
@@ -0,0 +1,136 @@
+import random
+import threading
+import time
+
+import requests
+
+
+class FetchError(Exception):
+    pass
+
+
+class CircuitOpenError(FetchError):
+    pass
+
+
+class TokenBucket:
+    # Limite le débit moyen à `rate` requêtes/s avec des rafales d'au plus `capacity` requêtes
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1)
+        self.tokens = self.capacity
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> float:
+        # Retourne le temps passé à attendre un jeton
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate)
+                self.last = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class FetchScheduler:
+    # Requêtes HTTP avec concurrence maximale, limitation de débit, nouvelles tentatives
+    # (backoff exponentiel avec jitter) et disjoncteur après trop d'échecs consécutifs.
+    # 404 est une réponse définitive (le match n'existe pas) ; 429, 5xx, timeouts, erreurs de
+    # connexion ou de lecture (requests.RequestException) et corps illisibles (voir get_decoded)
+    # sont considérés transitoires.
+
+    def __init__(self, max_concurrency: int = 8, rate: float = 10.0, burst: float = None, max_retries: int = 5,
+                 backoff: float = 0.5, max_backoff: float = 30.0, failure_threshold: int = 10,
+                 reset_timeout: float = 60.0, timeout: float = 30):
+        self.semaphore = threading.BoundedSemaphore(max_concurrency)
+        self.bucket = TokenBucket(rate, burst) if rate else None
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.timeout = timeout
+
+        self.lock = threading.Lock()
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.counters = {'requests': 0, 'retries': 0, 'not_found': 0, 'errors': 0,
+                         'rate_limit_wait_s': 0.0, 'backoff_wait_s': 0.0}
+
+    def get(self, session: requests.Session, url: str) -> requests.Response:
+        return self.get_decoded(session, url)[0]
+
+    def get_decoded(self, session: requests.Session, url: str, decode=None) -> tuple:
+        # Retourne (réponse, decode(réponse)) ; decode n'est appliqué qu'aux réponses 200 et
+        # une ValueError (JSON tronqué, document incomplet...) compte comme un échec transitoire
+        for attempt in range(self.max_retries + 1):
+            self.__check_circuit(url)
+
+            response, error, data = None, None, None
+            with self.semaphore:
+                if self.bucket is not None:
+                    self.__count('rate_limit_wait_s', self.bucket.acquire())
+                self.__count('requests')
+                try:
+                    response = session.get(url, timeout=self.timeout)
+                except requests.RequestException as exception:
+                    error = exception
+
+            if response is not None and response.status_code == 200 and decode is not None:
+                try:
+                    data = decode(response)
+                except ValueError as exception:
+                    error = exception
+
+            if response is not None and error is None and not self.is_transient(response.status_code):
+                self.__success()
+                if response.status_code == 404:
+                    self.__count('not_found')
+                return response, data
+
+            self.__failure()
+            if attempt == self.max_retries:
+                reason = error if error is not None else f"HTTP {response.status_code}"
+                raise FetchError(f"{url}: giving up after {attempt + 1} attempts ({reason})")
+
+            delay = self.__delay(attempt, response)
+            self.__count('retries')
+            self.__count('backoff_wait_s', delay)
+            time.sleep(delay)
+
+    @staticmethod
+    def is_transient(status_code: int) -> bool:
+        return status_code == 429 or status_code >= 500
+
+    def __delay(self, attempt: int, response: requests.Response) -> float:
+        # Respecte Retry-After si le serveur l'indique, sinon "full jitter"
+        if response is not None and response.headers.get('Retry-After', '').isdigit():
+            return min(self.max_backoff, float(response.headers['Retry-After']))
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def __check_circuit(self, url: str):
+        with self.lock:
+            if time.monotonic() < self.open_until:
+                raise CircuitOpenError(f"{url}: circuit open after {self.consecutive_failures} consecutive failures")
+
+    def __success(self):
+        with self.lock:
+            self.consecutive_failures = 0
+
+    def __failure(self):
+        with self.lock:
+            self.counters['errors'] += 1
+            self.consecutive_failures += 1
+            # Disjoncteur ouvert : plus aucune requête pendant reset_timeout, puis un essai
+            if self.consecutive_failures >= self.failure_threshold:
+                self.open_until = time.monotonic() + self.reset_timeout
+
+    def __count(self, name: str, value: float = 1):
+        with self.lock:
+            self.counters[name] += value
@@ -0,0 +1,300 @@
+import glob
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+import zlib
+from os.path import join, isfile, getsize, basename
+
+from ift6758.features.manifest import SeasonManifest
+
+# Décodeur JSON plus rapide si installé (pip install orjson)
+try:
+    import orjson
+
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
+
+
+# Champs du document brut réellement utilisés par le nettoyage (df_convert)
+CLEANING_FIELDS = {
+    'id': None,
+    'homeTeam': {'id': None, 'name': {'default': None}},
+    'awayTeam': {'id': None, 'name': {'default': None}},
+    'rosterSpots': {'playerId': None, 'firstName': {'default': None}, 'lastName': {'default': None}},
+    'plays': {'periodDescriptor': None, 'timeInPeriod': None, 'situationCode': None,
+              'typeDescKey': None, 'details': None},
+}
+
+PROJECTIONS = {'cleaning': CLEANING_FIELDS}
+
+
+def project(data, fields: dict):
+    # Ne garde que les champs demandés (None : on garde la valeur entière)
+    if fields is None:
+        return data
+    if isinstance(data, list):
+        return [project(item, fields) for item in data]
+    if not isinstance(data, dict):
+        return data
+    return {key: project(data[key], sub_fields) for key, sub_fields in fields.items() if key in data}
+
+
+class GameFiles:
+    # Un fichier JSON indenté par match : data/{type}/{year}/{year}_{game}.json
+    def __init__(self, path_directory: str, year: str):
+        self.path_directory = path_directory
+        self.year = year
+
+    def local_file(self, game: str) -> str:
+        return join(self.path_directory, f"{self.year}_{game}.json")
+
+    def is_intact(self, game: str, entry: dict) -> bool:
+        local_file = self.local_file(game)
+        return isfile(local_file) and getsize(local_file) == entry['size']
+
+    def read(self, game: str, entry: dict = None) -> dict:
+        return json_loads(self.read_raw(game))
+
+    def read_raw(self, game: str) -> bytes:
+        with open(self.local_file(game), 'rb') as file:
+            return file.read()
+
+    def write(self, game: str, data: dict) -> dict:
+        raw = json.dumps(data, ensure_ascii=False, indent=4).encode('utf-8')
+
+        # Écriture atomique pour ne jamais laisser un fichier partiel
+        local_file = self.local_file(game)
+        tmp_file = local_file + '.tmp'
+        with open(tmp_file, 'wb') as file:
+            file.write(raw)
+        os.replace(tmp_file, local_file)
+
+        return {'hash': hashlib.sha1(raw).hexdigest(), 'size': len(raw)}
+
+    def adopt(self, game: str, entry: dict = None):
+        # Fichier présent mais absent du manifeste (ancien cache ou crash), ou match rangé dans
+        # l'archive de la saison (changement de stockage) : il est recopié en fichier JSON
+        if not isfile(self.local_file(game)):
+            raw = read_stored(SeasonArchive(self.path_directory, self.year), entry)
+            if raw is None:
+                return None
+            data = json_loads(raw)
+            return data, self.write(game, data)
+        raw = self.read_raw(game)
+        try:
+            data = json_loads(raw)
+        except ValueError:
+            return None
+        return data, {'hash': hashlib.sha1(raw).hexdigest(), 'size': len(raw)}
+
+    def games(self) -> list:
+        prefix = f"{self.year}_"
+        return sorted(basename(path)[len(prefix):-len('.json')]
+                      for path in glob.glob(join(self.path_directory, f"{prefix}*.json")))
+
+
+class SeasonArchive:
+    # Tous les matchs d'une saison dans un seul fichier : chaque match est du JSON compact
+    # compressé indépendamment (zlib) et le manifeste garde sa position (offset, length),
+    # ce qui permet de relire un match sans décompresser la saison.
+    filename = "games.pbpz"
+
+    def __init__(self, path_directory: str, year: str, level: int = 6, filename: str = None):
+        self.path = join(path_directory, filename or self.filename)
+        self.level = level
+        self.legacy = GameFiles(path_directory, year)
+        self.lock = threading.Lock()
+
+    def size(self) -> int:
+        return getsize(self.path) if isfile(self.path) else 0
+
+    def is_intact(self, game: str, entry: dict) -> bool:
+        # Vérification rapide (position et en-tête zlib) ; read vérifie ensuite taille et empreinte
+        if 'offset' not in entry or entry['offset'] + entry['length'] > self.size():
+            return False
+        with open(self.path, 'rb') as file:
+            file.seek(entry['offset'])
+            header = file.read(2)
+        return len(header) == 2 and header[0] & 0x0F == 8 and (header[0] << 8 | header[1]) % 31 == 0
+
+    def read_raw(self, entry: dict) -> bytes:
+        # ValueError si le bloc ne correspond pas à l'entrée (archive réécrite, entrée périmée...)
+        with open(self.path, 'rb') as file:
+            file.seek(entry['offset'])
+            compressed = file.read(entry['length'])
+        decompressor = zlib.decompressobj()
+        try:
+            raw = decompressor.decompress(compressed)
+        except zlib.error as error:
+            raise ValueError(f"Corrupted archive entry in {self.path}: {error}") from error
+        # zlib ignore les octets après la fin du flux : le bloc doit se terminer exactement à length
+        if not decompressor.eof or decompressor.unused_data or len(raw) != entry['size'] \
+                or ('hash' in entry and hashlib.sha1(raw).hexdigest() != entry['hash']):
+            raise ValueError(f"Archive entry does not match the manifest in {self.path}")
+        return raw
+
+    def read(self, game: str, entry: dict) -> dict:
+        return json_loads(self.read_raw(entry))
+
+    def write(self, game: str, data: dict) -> dict:
+        return self.write_raw(json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+
+    def write_raw(self, raw: bytes) -> dict:
+        compressed = zlib.compress(raw, self.level)
+        # Ajout en fin de fichier, protégé pour les téléchargements concurrents
+        with self.lock:
+            with open(self.path, 'ab') as file:
+                offset = file.tell()
+                file.write(compressed)
+        return {'hash': hashlib.sha1(raw).hexdigest(), 'size': len(raw),
+                'offset': offset, 'length': len(compressed)}
+
+    def adopt(self, game: str, entry: dict = None):
+        # Un ancien fichier JSON est recopié dans l'archive
+        adopted = self.legacy.adopt(game)
+        if adopted is None:
+            return None
+        data, _ = adopted
+        return data, self.write(game, data)
+
+
+def season_directories(root: str = "data") -> list:
+    return sorted(path for game_type in ('regular_season', 'playoffs')
+                  for path in glob.glob(join(root, game_type, '*')) if os.path.isdir(path))
+
+
+def read_stored(archive: SeasonArchive, entry: dict):
+    # Bloc brut d'une entrée de l'archive, None s'il est absent ou ne correspond pas à l'entrée
+    if entry is None or 'offset' not in entry or not archive.is_intact(None, entry):
+        return None
+    try:
+        return archive.read_raw(entry)
+    except ValueError:
+        return None
+
+
+def compact_season(path_directory: str, year: str) -> dict:
+    # Réécrit l'archive de la saison (et ses archives de projection) à partir de toutes les entrées
+    # "ok" du manifeste : chaque match est relu dans l'archive actuelle, ou dans son ancien fichier
+    # JSON s'il n'y est pas. Les blocs orphelins (matchs retéléchargés) disparaissent et les
+    # fichiers JSON jamais adoptés sont ajoutés. Retourne la taille avant et après.
+    files = GameFiles(path_directory, year)
+    manifest = SeasonManifest(path_directory)
+    archive = SeasonArchive(path_directory, year)
+    games = sorted(set(manifest.known_games()) | set(files.games()))
+
+    projection_names = sorted({name for game in games
+                               for name in manifest.games.get(game, {}).get('projections', {})})
+    projections = {name: SeasonArchive(path_directory, year, filename=f"games.{name}.pbpz")
+                   for name in projection_names}
+    bytes_before = archive.size() + sum(projection.size() for projection in projections.values())
+
+    def tmp_archive(filename):
+        tmp = SeasonArchive(path_directory, year, filename=filename + '.tmp')
+        if isfile(tmp.path):
+            os.remove(tmp.path)
+        return tmp
+
+    tmp_main = tmp_archive(SeasonArchive.filename)
+    tmp_projections = {name: tmp_archive(basename(projection.path)) for name, projection in projections.items()}
+
+    entries = {}
+    for game in games:
+        entry = manifest.games.get(game)
+        if entry is not None and entry['status'] != 'ok':
+            entry = None
+
+        raw = read_stored(archive, entry)
+        if raw is not None:
+            stored = tmp_main.write_raw(raw)
+        elif isfile(files.local_file(game)):
+            data = files.read(game)
+            if entry is None:
+                entry = SeasonManifest.entry({}, data)
+            stored = tmp_main.write(game, data)
+        else:
+            # Ni dans l'archive ni en JSON : le match sera retéléchargé
+            print(f"{path_directory}: game {game} is missing from the cache, it will be downloaded again")
+            entries[game] = None
+            continue
+
+        new_entry = {key: value for key, value in entry.items() if key not in ('offset', 'length', 'projections')}
+        new_entry.update(stored)
+        # Projections recopiées seulement si elles correspondent toujours au match
+        if stored['hash'] == entry.get('hash'):
+            for name, projection_entry in entry.get('projections', {}).items():
+                projection_raw = read_stored(projections[name], projection_entry)
+                if projection_raw is not None:
+                    new_entry.setdefault('projections', {})[name] = tmp_projections[name].write_raw(projection_raw)
+        entries[game] = new_entry
+
+    # Le manifeste n'est mis à jour qu'une fois les nouvelles archives en place ; en cas d'arrêt
+    # entre les deux, read détecte les entrées périmées et les matchs sont relus ou retéléchargés
+    os.replace(tmp_main.path, archive.path)
+    for name, projection in projections.items():
+        if isfile(tmp_projections[name].path):
+            os.replace(tmp_projections[name].path, projection.path)
+        elif isfile(projection.path):
+            os.remove(projection.path)
+    for game, entry in entries.items():
+        if entry is None:
+            del manifest.games[game]
+        else:
+            manifest.games[game] = entry
+    manifest.nb_changes += len(entries)
+    manifest.save(manifest.complete)
+
+    bytes_after = archive.size() + sum(projection.size() for projection in projections.values())
+    return {'games': len(entries), 'bytes_before': bytes_before, 'bytes_after': bytes_after}
+
+
+def migrate_to_archive(root: str = "data", remove: bool = False) -> list:
+    # Convertit un arbre data/ de fichiers JSON en archives de saison (les saisons déjà en archive
+    # sont compactées) et compare l'espace disque et le temps de chargement des deux formats
+    report = []
+    for path_directory in season_directories(root):
+        year = basename(path_directory)
+        files = GameFiles(path_directory, year)
+        games = files.games()
+        if not games and not isfile(join(path_directory, SeasonArchive.filename)):
+            continue
+
+        json_bytes = 0
+        start = time.perf_counter()
+        for game in games:
+            json_bytes += len(files.read_raw(game))
+            files.read(game)
+        json_load = time.perf_counter() - start
+
+        compaction = compact_season(path_directory, year)
+
+        manifest = SeasonManifest(path_directory)
+        archive = SeasonArchive(path_directory, year)
+        start = time.perf_counter()
+        for game in manifest.known_games():
+            archive.read(game, manifest.games[game])
+        archive_load = time.perf_counter() - start
+
+        if remove:
+            for game in games:
+                if manifest.games.get(game, {}).get('status') == 'ok':
+                    os.remove(files.local_file(game))
+
+        report.append({'season': path_directory, 'games': compaction['games'], 'json_files': len(games),
+                       'json_bytes': json_bytes, 'archive_bytes_before': compaction['bytes_before'],
+                       'archive_bytes': archive.size(), 'json_load_s': json_load, 'archive_load_s': archive_load})
+        print(f"{path_directory}: {compaction['games']} games ({len(games)} JSON files, {json_bytes / 1e6:.1f} MB), "
+              f"archives {compaction['bytes_before'] / 1e6:.1f} MB -> {compaction['bytes_after'] / 1e6:.1f} MB, "
+              f"load {json_load:.2f}s (json) vs {archive_load:.2f}s (archive)")
+
+    return report
+
+
+if __name__ == "__main__":
+    # python -m ift6758.features.storage [data] [--remove]
+    migrate_to_archive(next((arg for arg in sys.argv[1:] if not arg.startswith('--')), "data"),
+                       remove='--remove' in sys.argv)
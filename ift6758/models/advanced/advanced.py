@@ -1,13 +1,13 @@
-import pandas as pd
 import numpy as np
 from pathlib import Path
-from sklearn.model_selection import train_test_split
 from sklearn.metrics import roc_curve, auc
 from sklearn.calibration import calibration_curve
 from xgboost import XGBClassifier
 import matplotlib.pyplot as plt
 import wandb
 
+from ift6758.models.harness import load_experiment
+
 # Initialiser un projet WandB
 wandb.init(project="XGBoost distance angle", config={
         "architecture": "Tree",
@@ -16,32 +16,26 @@ wandb.init(project="XGBoost distance angle", config={
         "random_state": 42,
     },)
 
-# Charger les données
-play_by_play_path = Path(__file__).parent.parent.parent.parent / "data" / "dataframe_2016_to_2019.csv"
-play_by_play = pd.read_csv(play_by_play_path)
-play_by_play = play_by_play.loc[play_by_play["gameType"] == "regular-season"].dropna()
-
+# Charger les données (une seule lecture par processus)
 # Variables indépendantes (features) : Distance + Angle
-X_both = play_by_play.iloc[:, 26:28]  # Distance et Angle
-y = play_by_play["isGoal"]
+split = load_experiment().split(["shotDistance", "shotAngle"], seed=42, test_size=0.2)
 
 # Fonction pour entraîner un modèle XGBoost et récupérer les prédictions
-def train_model(X, y):
-    X_train, X_validate, y_train, y_validate = train_test_split(X, y, test_size=0.2, random_state=42)
+def train_model(split):
     model = XGBClassifier(use_label_encoder=False, eval_metric='logloss', random_state=42)
     
-    model.fit(X_train, y_train)
-    prob = model.predict_proba(X_validate)[:, 1]
+    model.fit(split.X_train, split.y_train)
+    prob = model.predict_proba(split.X_validate)[:, 1]
     
     # Loguer les paramètres du modèle
     wandb.log({"learning_rate": model.get_params()['learning_rate'],
                "n_estimators": model.get_params()['n_estimators'],
                "max_depth": model.get_params()['max_depth']})
     wandb.log_model(path=Path(__file__),name="XGBoost_dist_angle")
-    return prob, y_validate
+    return prob, split.y_validate
 
 # Entraîner le modèle pour "Distance + Angle"
-prob_both, y_validate = train_model(X_both, y)
+prob_both, y_validate = train_model(split)
 
 # Générer une ligne de base aléatoire (probabilités uniformes)
 np.random.seed(42)
@@ -2,7 +2,7 @@ import pandas as pd
 import numpy as np
 from pathlib import Path
 from sklearn.calibration import calibration_curve
-from sklearn.model_selection import GridSearchCV, train_test_split
+from sklearn.model_selection import GridSearchCV
 from sklearn.metrics import roc_curve, auc
 from sklearn.feature_selection import VarianceThreshold, SelectKBest, f_classif
 import matplotlib.pyplot as plt
@@ -10,6 +10,9 @@ import wandb
 from xgboost import XGBClassifier
 import shap
 
+from ift6758.models.harness import load_experiment
+from ift6758.models.search import successive_halving
+
 # Initialiser un projet WandB
 wandb.init(project="XGBoost all features", config={
         "architecture": "Tree",
@@ -19,32 +22,23 @@ wandb.init(project="XGBoost all features", config={
     },)
 
 
-# Charger les données
-data_path = Path(__file__).parent.parent.parent.parent / "data" / "dataframe_2016_to_2019.csv"
-data = pd.read_csv(data_path)
-
-# Filtrer les données pour les matchs de saison régulière et supprimer les lignes manquantes
-data = data.loc[data["gameType"] == "regular-season"].dropna()
+# Charger les données (une seule lecture par processus) : saison régulière, lignes complètes
+experiment = load_experiment()
 
-# Encodage des variables catégoriques
-def encode_and_bind(df, feature):
-    dummies = pd.get_dummies(df[feature], prefix=feature)
-    return pd.concat([df.drop(columns=feature), dummies], axis=1)
-
-# Préparer les caractéristiques et la cible 26 27 
-# Supprimer les colonnes non pertinentes
-X = data.drop(data.columns[[1, 2, 3, 5, 6, 14, 15, 16, 18, 19, 20, 21]], axis=1)
+# Préparer les caractéristiques et la cible
+# Colonnes retenues (identifiants, noms et cible exclus)
+FEATURE_COLUMNS = ["Year", "numberPeriod", "gameSeconds", "previousEventType", "timeSinceLastEvent",
+                   "previousXCoord", "previousYCoord", "xCoord", "yCoord", "shotType", "shotDistance",
+                   "distanceFromLastEvent", "rebound", "speedFromLastEvent", "shotAngle", "reboundAngleShot",
+                   "offensivePressureTime"]
+# Variables catégoriques encodées en indicatrices
 features_to_encode = ["previousEventType", "shotType"]
 
-# Appliquer l'encodage sur les caractéristiques sélectionnées
-for feature in features_to_encode:
-    X = encode_and_bind(X, feature)
-
-y = data["isGoal"]
+split = experiment.split(FEATURE_COLUMNS, encode=features_to_encode, seed=42, test_size=0.2)
+X = experiment.features(FEATURE_COLUMNS, encode=features_to_encode)
 
 # Fonction pour entraîner un modèle et récupérer les probabilités prédites
-def train_model(X, y):
-    X_train, X_validate, y_train, y_validate = train_test_split(X, y, test_size=0.2, random_state=42)
+def train_model(split):
     model = XGBClassifier(
         n_estimators=200,
         learning_rate=0.05,
@@ -54,7 +48,7 @@ def train_model(X, y):
         eval_metric="logloss",
         random_state=42
     )
-    model.fit(X_train, y_train)
+    model.fit(pd.DataFrame(split.X_train, columns=split.columns), split.y_train)
 
         # Loguer les paramètres du modèle
     wandb.log({"learning_rate": model.get_params()['learning_rate'],
@@ -68,11 +62,11 @@ def train_model(X, y):
     shap.summary_plot(shap_values, X)
 
     # Prédire les probabilités sur l'ensemble de validation
-    prob = model.predict_proba(X_validate)[:, 1]
-    return prob, y_validate
+    prob = model.predict_proba(pd.DataFrame(split.X_validate, columns=split.columns))[:, 1]
+    return prob, split.y_validate
 
 # Entraîner le modèle
-probabilities, y_validate = train_model(X, y)
+probabilities, y_validate = train_model(split)
 
 # Générer une base aléatoire pour comparaison
 np.random.seed(42)
@@ -160,7 +154,7 @@ plt.grid()
 
 
 # Recherche des hyperparamètres avec GridSearchCV
-def perform_grid_search(X, y):
+def perform_grid_search(split):
     param_grid = {
         "n_estimators": [50, 100, 200],
         "learning_rate": [0.01, 0.05, 0.1],
@@ -169,12 +163,26 @@ def perform_grid_search(X, y):
     }
     model = XGBClassifier(eval_metric="logloss", random_state=42)
     grid_search = GridSearchCV(model, param_grid, cv=3, scoring="accuracy", n_jobs=-1, verbose=1)
-    X_train, X_val, y_train, y_val = train_test_split(X, y, test_size=0.2, random_state=42)
-    grid_search.fit(X_train, y_train)
+    grid_search.fit(split.X_train, split.y_train)
     print("Meilleurs hyperparamètres :", grid_search.best_params_)
 
-# Appeler la recherche d'hyperparamètres
-perform_grid_search(X, y)
+# Recherche par divisions successives : mêmes hyperparamètres, n_estimators choisi par arrêt précoce
+def perform_halving_search(split):
+    search = successive_halving(np.asarray(split.X_train), np.asarray(split.y_train))
+    print("Meilleurs hyperparamètres :", search["best_params"])
+    wandb.log({"search_best_params": search["best_params"], "search_logloss": search["logloss"],
+               "search_auc": search["auc"],
+               "search_curve": wandb.Table(columns=["seconds", "logloss", "auc"],
+                                           data=[[point["seconds"], point["logloss"], point["auc"]]
+                                                 for point in search["curve"]])})
+    return search
+
+# Appeler la recherche d'hyperparamètres ("grid" : grille exhaustive GridSearchCV, plus lente)
+SEARCH_MODE = "halving"
+if SEARCH_MODE == "grid":
+    perform_grid_search(split)
+else:
+    perform_halving_search(split)
 
 # Loguer le diagramme de fiabilité
 wandb.log({"calibration_plot": wandb.Image(plt)})
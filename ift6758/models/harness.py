@@ -0,0 +1,159 @@
+import glob
+import hashlib
+import json
+import os
+from collections import namedtuple
+from functools import lru_cache
+from os.path import join, isfile, getmtime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+
+from ift6758.data.registry import select_features
+from ift6758.data.store import FEATURE_STORE, list_partitions, load_feature_store
+
+DATASET = Path(__file__).parent.parent.parent / "data" / "dataframe_2016_to_2019.csv"
+# Saisons d'entraînement des modèles, les mêmes que l'ancien export CSV
+DATASET_YEARS = (2016, 2017, 2018, 2019)
+
+# Jeux d'entraînement et de validation ; columns : noms des colonnes de X après encodage
+Split = namedtuple('Split', ['X_train', 'X_validate', 'y_train', 'y_validate', 'columns'])
+
+
+class Experiment:
+    # Jeu de données des modèles lu une seule fois (saison régulière, lignes complètes) depuis le magasin
+    # de caractéristiques s'il a toutes les saisons demandées, sinon depuis le CSV nettoyé (path).
+    # Les séparations entraînement/validation sont gardées en mémoire par (caractéristiques, encodage,
+    # graine, proportion de validation) sous forme de tableaux contigus ; avec cache_directory, elles
+    # sont aussi écrites en .npy et relues en mémoire partagée (mmap) par les exécutions suivantes.
+    # Les indices de la séparation ne dépendent que du nombre de lignes et de la graine : ce sont
+    # les mêmes lignes que train_test_split(X, y, test_size, random_state=seed) sur le tableau.
+
+    def __init__(self, path: str = DATASET, game_type: str = "regular-season", cache_directory: str = None,
+                 dtype=np.float64, feature_store: str = FEATURE_STORE, years: tuple = DATASET_YEARS):
+        self.path = path
+        self.game_type = game_type
+        self.feature_store = feature_store
+        self.years = years
+        self.cache_directory = cache_directory
+        self.dtype = dtype
+        self.__data = None
+        self.__indices = {}
+        self.splits = {}
+
+    @property
+    def data(self) -> pd.DataFrame:
+        if self.__data is None:
+            partitions, missing = self.__partitions()
+            if not missing:
+                data = load_feature_store(years=self.years, game_types=[self.game_type], root=self.feature_store)
+            else:
+                # Magasin incomplet : toutes les saisons viennent du CSV, jamais un mélange des deux sources
+                if not isfile(self.path):
+                    raise FileNotFoundError(f"Seasons {missing} ({self.game_type}) missing from {self.feature_store}"
+                                            f" and no CSV at {self.path}")
+                if partitions:
+                    print(f"Seasons {missing} ({self.game_type}) missing from {self.feature_store}, "
+                          f"reading {self.path}")
+                data = pd.read_csv(self.path)
+                data = data.loc[(data["gameType"] == self.game_type) & data["Year"].isin(self.years)]
+                missing = sorted(set(self.years) - set(data["Year"].unique()))
+                if missing:
+                    raise ValueError(f"Seasons {missing} ({self.game_type}) missing from {self.path}")
+            self.__data = data.dropna()
+        return self.__data
+
+    def features(self, names: list, encode: tuple = ()) -> pd.DataFrame:
+        # Caractéristiques demandées, colonnes de encode remplacées par des indicatrices
+        X = select_features(self.data, list(names))
+        for feature in encode:
+            values = X[feature]
+            # Catégories du magasin absentes de ces lignes : pas d'indicatrice toujours nulle
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                values = values.cat.remove_unused_categories()
+            X = pd.concat([X.drop(columns=feature), pd.get_dummies(values, prefix=feature)], axis=1)
+        return X
+
+    def indices(self, seed: int = 42, test_size: float = 0.2) -> tuple:
+        key = (seed, test_size)
+        if key not in self.__indices:
+            self.__indices[key] = train_test_split(np.arange(len(self.data)), test_size=test_size,
+                                                   random_state=seed)
+        return self.__indices[key]
+
+    def split(self, names: list, encode: tuple = (), seed: int = 42, test_size: float = 0.2,
+              target: str = "isGoal") -> Split:
+        key = (tuple(names), tuple(encode), seed, test_size, target)
+        if key not in self.splits:
+            self.splits[key] = self.__load_split(key) or self.__make_split(key)
+        return self.splits[key]
+
+    def run(self, configurations: dict, seed: int = 42, test_size: float = 0.2) -> dict:
+        # configurations : {nom: (caractéristiques, fabrique du modèle[, colonnes à encoder])}.
+        # Tous les modèles sont entraînés dans ce processus sur les séparations en cache.
+        # Retourne {nom: (modèle entraîné, probabilités de but sur la validation)}.
+        results = {}
+        for name, configuration in configurations.items():
+            names, make_model = configuration[:2]
+            encode = configuration[2] if len(configuration) > 2 else ()
+            split = self.split(names, encode, seed, test_size)
+            model = make_model()
+            model.fit(split.X_train, split.y_train)
+            results[name] = (model, model.predict_proba(split.X_validate)[:, 1])
+        return results
+
+    def __make_split(self, key: tuple) -> Split:
+        names, encode, seed, test_size, target = key
+        X = self.features(names, encode)
+        train, validate = self.indices(seed, test_size)
+        values = X.to_numpy(dtype=self.dtype)
+        y = self.data[target].to_numpy()
+        split = Split(np.ascontiguousarray(values[train]), np.ascontiguousarray(values[validate]),
+                      y[train], y[validate], list(X.columns))
+        self.__save_split(key, split)
+        return split
+
+    def __partitions(self) -> tuple:
+        # (partitions du magasin pour les saisons demandées, saisons sans partition)
+        partitions = {year: path_directory for year, game_type, path_directory in list_partitions(self.feature_store)
+                      if game_type == self.game_type and year in self.years}
+        return list(partitions.values()), [year for year in self.years if year not in partitions]
+
+    def __split_path(self, key: tuple) -> str:
+        # Le cache est invalidé si une partition lue (ou le CSV, à défaut) est modifiée
+        partitions, missing = self.__partitions()
+        files = [str(self.path)] if missing else sorted(file for path_directory in partitions
+                                                        for file in glob.glob(join(path_directory, "*.parquet")))
+        fingerprint = json.dumps([[(file, getmtime(file)) for file in files], self.game_type, list(self.years),
+                                  np.dtype(self.dtype).str, list(key)])
+        return join(self.cache_directory, hashlib.sha1(fingerprint.encode()).hexdigest()[:16])
+
+    def __load_split(self, key: tuple) -> Split:
+        if self.cache_directory is None:
+            return None
+        path = self.__split_path(key)
+        if not isfile(join(path, "columns.json")):
+            return None
+        with open(join(path, "columns.json"), 'r', encoding='utf-8') as file:
+            columns = json.load(file)
+        return Split(*[np.load(join(path, f"{field}.npy"), mmap_mode='r') for field in Split._fields[:4]], columns)
+
+    def __save_split(self, key: tuple, split: Split):
+        if self.cache_directory is None:
+            return
+        path = self.__split_path(key)
+        os.makedirs(path, exist_ok=True)
+        for field in Split._fields[:4]:
+            np.save(join(path, f"{field}.npy"), getattr(split, field))
+        # Écrit en dernier : sa présence marque une séparation complète
+        with open(join(path, "columns.json"), 'w', encoding='utf-8') as file:
+            json.dump(split.columns, file)
+
+
+@lru_cache(maxsize=None)
+def load_experiment(path: str = DATASET, game_type: str = "regular-season", cache_directory: str = None,
+                    feature_store: str = FEATURE_STORE, years: tuple = DATASET_YEARS) -> Experiment:
+    # Même instance pour tous les scripts exécutés dans un processus (ex. notebook) : lecture unique des données
+    return Experiment(path, game_type, cache_directory, feature_store=feature_store, years=tuple(years))
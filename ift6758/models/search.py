@@ -0,0 +1,74 @@
+import math
+import time
+from itertools import product
+
+import numpy as np
+import xgboost as xgb
+from sklearn.metrics import roc_auc_score
+from sklearn.model_selection import train_test_split
+
+# Même grille que perform_grid_search ; le nombre d'arbres (n_estimators) devient le budget de la recherche
+PARAM_GRID = {
+    "learning_rate": [0.01, 0.05, 0.1],
+    "max_depth": [5, 7, 9],
+    "subsample": [0.7, 0.8, 1.0],
+}
+
+
+def successive_halving(X: np.ndarray, y: np.ndarray, param_grid: dict = PARAM_GRID, max_rounds: int = 200,
+                       eta: int = 3, early_stopping_rounds: int = 20, holdout_size: float = 0.2, seed: int = 42,
+                       nthread: int = -1) -> dict:
+    # Recherche par divisions successives : toutes les configurations reçoivent d'abord quelques arbres,
+    # seul le meilleur tiers (eta = 3) continue avec trois fois plus d'arbres, jusqu'à max_rounds.
+    # Les modèles retenus reprennent l'entraînement là où ils s'étaient arrêtés, et une configuration
+    # dont la log-loss ne s'améliore plus depuis early_stopping_rounds arbres n'est plus entraînée.
+    # La sélection se fait sur une partie de X (holdout_size) : la validation des scripts reste intacte.
+    # Les matrices XGBoost (tree_method hist, quantiles calculés une fois) sont partagées par tous
+    # les entraînements, chacun sur tous les cœurs (nthread).
+    # Retourne les meilleurs paramètres, leurs scores et la courbe temps -> qualité (un point par palier).
+    start = time.perf_counter()
+    fit, holdout = train_test_split(np.arange(len(y)), test_size=holdout_size, random_state=seed, stratify=y)
+    dtrain = xgb.QuantileDMatrix(X[fit], y[fit], nthread=nthread)
+    dholdout = xgb.DMatrix(X[holdout], y[holdout], nthread=nthread)
+    y_holdout = np.asarray(y[holdout])
+
+    names = list(param_grid)
+    candidates = [{'params': dict(zip(names, values)), 'booster': None, 'history': [], 'stopped': False}
+                  for values in product(*param_grid.values())]
+
+    nb_rungs = int(math.floor(math.log(len(candidates), eta) + 1e-9)) + 1
+    budgets = [max(1, int(round(max_rounds * eta ** (rung - nb_rungs + 1)))) for rung in range(nb_rungs)]
+
+    curve = []
+    for rung, rounds in enumerate(budgets):
+        for candidate in candidates:
+            if candidate['stopped'] or len(candidate['history']) >= rounds:
+                continue
+            params = {'objective': 'binary:logistic', 'eval_metric': 'logloss', 'tree_method': 'hist',
+                      'eta': candidate['params']['learning_rate'], 'max_depth': candidate['params']['max_depth'],
+                      'subsample': candidate['params']['subsample'], 'seed': seed, 'nthread': nthread}
+            evals_result = {}
+            candidate['booster'] = xgb.train(params, dtrain, num_boost_round=rounds - len(candidate['history']),
+                                             evals=[(dholdout, 'holdout')], evals_result=evals_result,
+                                             xgb_model=candidate['booster'], verbose_eval=False)
+            candidate['history'] += evals_result['holdout']['logloss']
+            best_round = int(np.argmin(candidate['history']))
+            candidate['stopped'] = len(candidate['history']) - 1 - best_round >= early_stopping_rounds
+
+        candidates.sort(key=lambda candidate: min(candidate['history']))
+        best = candidates[0]
+        best_rounds = int(np.argmin(best['history'])) + 1
+        prob = best['booster'].predict(dholdout, iteration_range=(0, best_rounds))
+        curve.append({'rung': rung, 'rounds': rounds, 'candidates': len(candidates),
+                      'seconds': time.perf_counter() - start, 'logloss': float(min(best['history'])),
+                      'auc': float(roc_auc_score(y_holdout, prob))})
+        print(f"Palier {rung} : {len(candidates)} configurations, {rounds} arbres, "
+              f"log-loss {curve[-1]['logloss']:.4f}, AUC {curve[-1]['auc']:.4f}, {curve[-1]['seconds']:.1f} s")
+
+        if rung < nb_rungs - 1:
+            candidates = candidates[:max(1, len(candidates) // eta)]
+
+    best = candidates[0]
+    best_rounds = int(np.argmin(best['history'])) + 1
+    return {'best_params': {**best['params'], 'n_estimators': best_rounds}, 'logloss': curve[-1]['logloss'],
+            'auc': curve[-1]['auc'], 'curve': curve, 'booster': best['booster']}
@@ -1,37 +1,24 @@
-import pandas as pd
 import numpy as np
-from pathlib import Path
-from sklearn.model_selection import train_test_split
 from sklearn.linear_model import LogisticRegression
 from sklearn.metrics import roc_curve, auc
 from sklearn.calibration import calibration_curve
 import matplotlib.pyplot as plt
 
-# Charger les données
-play_by_play_path = Path(__file__).parent.parent.parent.parent / "data" / "dataframe_2016_to_2019.csv"
-play_by_play = pd.read_csv(play_by_play_path)
-play_by_play = play_by_play.loc[play_by_play["gameType"] == "regular-season"].dropna()
+from ift6758.models.harness import load_experiment
 
-# Variables indépendantes (features) : distance, angle
-X_distance = play_by_play.iloc[:, 26:27]  # Distance
-X_angle = play_by_play.iloc[:, 27:28]  # Angle 
-X_both = play_by_play.iloc[:, 26:28]  # Distance et angle
-
-# Variable cible
-y = play_by_play["isGoal"]
-
-# Fonction pour entraîner un modèle et récupérer les prédictions
-def train_model(X, y):
-    X_train, X_validate, y_train, y_validate = train_test_split(X, y, test_size=0.2, random_state=42)
-    model = LogisticRegression()
-    model.fit(X_train, y_train)
-    prob = model.predict_proba(X_validate)[:, 1]
-    return prob, y_validate
+# Charger les données (une seule lecture) et entraîner les trois modèles sur les mêmes séparations
+experiment = load_experiment()
+results = experiment.run({
+    "Distance": (["shotDistance"], LogisticRegression),
+    "Angle": (["shotAngle"], LogisticRegression),
+    "Distance + Angle": (["shotDistance", "shotAngle"], LogisticRegression),
+}, seed=42, test_size=0.2)
 
 # Obtenir les probabilités et les vraies étiquettes pour chaque modèle
-prob_distance, y_validate = train_model(X_distance, y)
-prob_angle, _ = train_model(X_angle, y)
-prob_both, _ = train_model(X_both, y)
+prob_distance = results["Distance"][1]
+prob_angle = results["Angle"][1]
+prob_both = results["Distance + Angle"][1]
+y_validate = experiment.split(["shotDistance"], seed=42, test_size=0.2).y_validate
 
 # Générer une ligne de base aléatoire (probabilités uniformes)
 np.random.seed(42)
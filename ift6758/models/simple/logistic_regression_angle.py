@@ -1,10 +1,10 @@
-import pandas as pd
 from pathlib import Path
-from sklearn.model_selection import train_test_split
 from sklearn.linear_model import LogisticRegression
 from sklearn.metrics import accuracy_score
 import wandb
 
+from ift6758.models.harness import load_experiment
+
 # Initialize WandB for tracking experiment
 wandb.init(
     project="Logistic Regression Angle",
@@ -16,19 +16,10 @@ wandb.init(
     },
 )
 
-# Load dataset
-play_by_play_path = Path(__file__).parent.parent.parent.parent / "data" / "dataframe_2016_to_2019.csv"
-play_by_play = pd.read_csv(play_by_play_path)
-
-# Filter for regular-season games and remove missing values
-play_by_play = play_by_play.loc[play_by_play["gameType"] == "regular-season"].dropna()
-
+# Load dataset (once per process) and get the cached training and validation sets
 # Select features and target
-X = play_by_play.iloc[:, 26:27]  # Shot distance (for example)
-y = play_by_play["isGoal"]
-
-# Split dataset into training and validation sets
-X_train, X_validate, y_train, y_validate = train_test_split(X, y, test_size=0.2, random_state=42)
+split = load_experiment().split(["shotAngle"], seed=42, test_size=0.2)
+X_train, X_validate, y_train, y_validate = split[:4]
 
 # Train a logistic regression model
 model = LogisticRegression()
@@ -1,3 +1,5 @@
 
 from ift6758.visualizations.visualisations_avancees.utils import *
 from ift6758.visualizations.visualisations_avancees.allshoots import *
+from ift6758.visualizations.visualisations_avancees.density import *
+from ift6758.visualizations.visualisations_avancees.report import *
@@ -1 +1,31 @@
-team_shots_coords = {}
\ No newline at end of file
+from collections import OrderedDict
+
+
+class LRUCache:
+    # Dictionnaire borné : au-delà de maxsize, l'entrée la moins récemment utilisée est retirée
+    def __init__(self, maxsize: int = 8):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+
+    def __contains__(self, key) -> bool:
+        return key in self.entries
+
+    def __getitem__(self, key):
+        self.entries.move_to_end(key)
+        return self.entries[key]
+
+    def __setitem__(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def clear(self):
+        self.entries.clear()
+
+
+# Tirs par équipe déjà calculés, clé (saison, séries incluses)
+team_shots_coords = LRUCache(maxsize=8)
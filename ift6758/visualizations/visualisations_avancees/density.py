@@ -0,0 +1,95 @@
+import os
+from functools import lru_cache
+from os.path import join
+
+import numpy as np
+import pandas as pd
+
+# Grilles de densité de tirs précalculées, une par saison (et sélection de types de match) :
+# data/density/2016_regular-season.npz
+DENSITY_DIRECTORY = "data/density"
+
+# Zone offensive en coordonnées ajustées (pieds) : largeur de la patinoire et distance depuis
+# la ligne rouge, but attaqué en (0, 89). Cases de 1 pied.
+GRID_X_EDGES = np.arange(-42.5, 43.5, 1.0)
+GRID_Y_EDGES = np.arange(0.0, 101.0, 1.0)
+
+
+def density_path(root: str, year: int, game_types: tuple) -> str:
+    return join(root, f"{year}_{'+'.join(game_types)}.npz")
+
+
+def gaussian_kernel_matrix(nb_bins: int, sigma: float) -> np.ndarray:
+    # Lissage gaussien d'un axe sous forme de matrice (nb_bins, nb_bins), normalisée par ligne
+    # pour ne pas perdre de tirs sur les bords
+    positions = np.arange(nb_bins)
+    kernel = np.exp(-0.5 * ((positions[:, None] - positions[None, :]) / sigma) ** 2)
+    return kernel / kernel.sum(axis=1, keepdims=True)
+
+
+def smooth_grids(grids: np.ndarray, sigma: float) -> np.ndarray:
+    # Lissage séparable de toutes les grilles (équipes, y, x) en deux produits matriciels
+    kernel_y = gaussian_kernel_matrix(grids.shape[-2], sigma)
+    kernel_x = gaussian_kernel_matrix(grids.shape[-1], sigma)
+    return kernel_y @ grids @ kernel_x.T
+
+
+def build_shot_density(df: pd.DataFrame, year: int, root: str = DENSITY_DIRECTORY, sigma: float = 3.0,
+                       game_types: tuple = None) -> str:
+    # df : tirs nettoyés d'une saison (ex. load_feature_store(years=[year])).
+    # Enregistre, en float32, le taux de tirs par match lissé de la ligue et l'écart de chaque équipe.
+    # game_types : types de match demandés, qui nomment le fichier même si df n'en contient qu'une
+    # partie (ex. pas encore de séries) ; par défaut, ceux présents dans df.
+    # Import local : ift6758.data importe déjà ce module
+    from ift6758.data.registry import evaluate
+
+    if game_types is not None:
+        game_types = tuple(sorted(game_types))
+    elif 'gameType' in df.columns:
+        game_types = tuple(sorted(df['gameType'].astype(object).dropna().unique()))
+    else:
+        game_types = ('all',)
+
+    adjusted = evaluate(df, ['_adjustedCoord'])['_adjustedCoord']
+    teams = df['eventOwnerTeam'].astype(object).to_numpy()
+    valid = ~np.isnan(adjusted).any(axis=1) & pd.notna(teams)
+
+    # Toutes les équipes d'un coup : histogramme 3D (équipe, y, x)
+    team_names, team_codes = np.unique(teams[valid], return_inverse=True)
+    counts, _ = np.histogramdd(np.column_stack((team_codes, adjusted[valid, 1], adjusted[valid, 0])),
+                               bins=(np.arange(len(team_names) + 1) - 0.5, GRID_Y_EDGES, GRID_X_EDGES))
+
+    # Taux par match : chaque équipe joue un match par idGame où elle a tiré
+    team_games = df[['eventOwnerTeam', 'idGame']].astype(object).dropna().drop_duplicates()
+    nb_games = team_games.groupby('eventOwnerTeam')['idGame'].size().reindex(team_names).to_numpy()
+
+    team_rates = smooth_grids(counts / nb_games[:, None, None], sigma)
+    league_rate = smooth_grids(counts.sum(axis=0) / nb_games.sum(), sigma)
+
+    os.makedirs(root, exist_ok=True)
+    path = density_path(root, year, game_types)
+    np.savez_compressed(path, teams=team_names.astype(str), league=league_rate.astype(np.float32),
+                        excess=(team_rates - league_rate).astype(np.float32), games=nb_games,
+                        x_edges=GRID_X_EDGES, y_edges=GRID_Y_EDGES, sigma=sigma)
+    load_shot_density.cache_clear()
+    return path
+
+
+@lru_cache(maxsize=16)
+def load_shot_density(year: int, game_types: tuple = ('regular-season',), root: str = DENSITY_DIRECTORY) -> dict:
+    # Grilles d'une saison telles qu'enregistrées par build_shot_density (lues une fois puis gardées)
+    with np.load(density_path(root, year, game_types)) as density:
+        grids = {name: density[name] for name in density.files}
+    grids['team_index'] = {team: index for index, team in enumerate(grids['teams'])}
+    return grids
+
+
+def excess_shot_rate(year: int, team: str, game_types: tuple = ('regular-season',),
+                     root: str = DENSITY_DIRECTORY) -> np.ndarray:
+    # Écart (tirs par match et par pied carré) entre l'équipe et la moyenne de la ligue, grille (y, x)
+    grids = load_shot_density(year, game_types, root)
+    return grids['excess'][grids['team_index'][team]]
+
+
+def league_shot_rate(year: int, game_types: tuple = ('regular-season',), root: str = DENSITY_DIRECTORY) -> np.ndarray:
+    return load_shot_density(year, game_types, root)['league']
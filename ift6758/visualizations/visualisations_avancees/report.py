@@ -0,0 +1,118 @@
+import json
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from os.path import join, isfile
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from matplotlib.image import imread
+
+from ift6758.visualizations.visualisations_avancees.density import (DENSITY_DIRECTORY, GRID_X_EDGES, GRID_Y_EDGES,
+                                                                     density_path, load_shot_density)
+
+RINK_IMAGE = "figures/nhl_rink.png"
+REPORT_DIRECTORY = "figures/shot_maps"
+MANIFEST_FILE = "manifest.json"
+
+# Zone offensive dessinée, en coordonnées ajustées (pieds) : but attaqué en haut
+RINK_EXTENT = (GRID_X_EDGES[0], GRID_X_EDGES[-1], GRID_Y_EDGES[0], GRID_Y_EDGES[-1])
+
+
+def load_rink(path: str = RINK_IMAGE) -> np.ndarray:
+    # Patinoire de 200 x 85 pieds -> moitié droite (de la ligne rouge à la bande), tournée pour que
+    # le but attaqué soit en haut comme dans les grilles de densité
+    rink = imread(path)
+    half = rink[:, rink.shape[1] // 2:]
+    # Moitié de 100 pieds, grilles de GRID_Y_EDGES[-1] pieds
+    half = half[:, :int(round(half.shape[1] * GRID_Y_EDGES[-1] / 100))]
+    return np.ascontiguousarray(np.rot90(half))
+
+
+def report_file_name(year: int, game_types: tuple, team: str) -> str:
+    return f"{year}_{'+'.join(game_types)}_{re.sub(r'[^A-Za-z0-9]+', '_', team).strip('_')}.png"
+
+
+def init_report_worker(rink: np.ndarray):
+    # La patinoire est décodée une fois par le processus principal et transmise à chaque processus
+    global worker_rink
+    worker_rink = rink
+
+
+def render_shot_map(task: tuple) -> dict:
+    # Un graphique : écart du taux de tirs de l'équipe à la ligue, sur la zone offensive
+    year, game_types, team, vmax, output, root, dpi = task
+    grids = load_shot_density(year, game_types, root)
+    excess = grids['excess'][grids['team_index'][team]]
+
+    # Figure sans pyplot : rendu Agg, aucun état global ni fenêtre
+    figure = Figure(figsize=(5, 6))
+    FigureCanvasAgg(figure)
+    ax = figure.add_subplot()
+    ax.imshow(worker_rink, extent=RINK_EXTENT, zorder=0)
+    levels = np.linspace(-vmax, vmax, 13)
+    x_centers = (GRID_X_EDGES[:-1] + GRID_X_EDGES[1:]) / 2
+    y_centers = (GRID_Y_EDGES[:-1] + GRID_Y_EDGES[1:]) / 2
+    contour = ax.contourf(x_centers, y_centers, excess, levels=levels, cmap='RdBu_r', alpha=0.6, extend='both',
+                          zorder=1)
+    figure.colorbar(contour, ax=ax, label="Écart de tirs par match (par pied carré)")
+    ax.set_xlim(RINK_EXTENT[0], RINK_EXTENT[1])
+    ax.set_ylim(RINK_EXTENT[2], RINK_EXTENT[3])
+    ax.set_aspect('equal')
+    ax.set_title(f"{team} - {year} ({', '.join(game_types)})")
+
+    path = join(output, report_file_name(year, game_types, team))
+    figure.savefig(path, dpi=dpi)
+    return {'year': year, 'game_types': list(game_types), 'team': team, 'path': path,
+            'games': int(grids['games'][grids['team_index'][team]]),
+            'max_excess': float(excess.max()), 'min_excess': float(excess.min())}
+
+
+def build_shot_map_report(years: list, game_types: tuple = ('regular-season',), output: str = REPORT_DIRECTORY,
+                          root: str = DENSITY_DIRECTORY, rink_path: str = RINK_IMAGE, workers: int = None,
+                          dpi: int = 100, feature_store: str = None) -> list:
+    # Une carte de tirs par équipe et par saison, rendues en parallèle (workers : os.cpu_count() par défaut).
+    # Les grilles de densité manquantes sont d'abord calculées depuis le magasin de caractéristiques
+    # (feature_store : FEATURE_STORE par défaut), pour les types de match demandés.
+    # Retourne le manifeste, aussi écrit dans output/manifest.json.
+    game_types = tuple(sorted(game_types))
+    os.makedirs(output, exist_ok=True)
+
+    tasks = []
+    for year in years:
+        if not isfile(density_path(root, year, game_types)):
+            # Import local : ift6758.data importe déjà ce module
+            from ift6758.data.store import FEATURE_STORE, load_feature_store
+            from ift6758.visualizations.visualisations_avancees.density import build_shot_density
+            df = load_feature_store(years=[year], game_types=list(game_types), root=feature_store or FEATURE_STORE)
+            build_shot_density(df, year, root, game_types=game_types)
+            del df
+        grids = load_shot_density(year, game_types, root)
+        # Même échelle de couleurs pour toutes les équipes d'une saison
+        vmax = float(np.abs(grids['excess']).max()) or 1.0
+        tasks += [(year, game_types, str(team), vmax, output, root, dpi) for team in grids['teams']]
+
+    rink = load_rink(rink_path)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        init_report_worker(rink)
+        manifest = [render_shot_map(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_report_worker,
+                                 initargs=(rink,)) as executor:
+            manifest = list(executor.map(render_shot_map, tasks, chunksize=max(1, len(tasks) // (4 * workers))))
+
+    path = join(output, MANIFEST_FILE)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        json.dump(manifest, file, indent=1, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    return manifest
+
+
+if __name__ == "__main__":
+    # python -m ift6758.visualizations.visualisations_avancees.report 2016 2020 [nombre de processus]
+    build_shot_map_report(range(int(sys.argv[1]), int(sys.argv[2]) + 1),
+                          workers=int(sys.argv[3]) if len(sys.argv) > 3 else None)
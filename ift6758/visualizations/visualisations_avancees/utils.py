@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 
 from ift6758.visualizations.visualisations_avancees.allshoots import team_shots_coords
@@ -39,40 +40,44 @@ def get_coor(row: pd.Series, home_team_initial_side: str) -> list:
     return new_coords
 
 
-def get_shoot_by_team(regular_season: dict = None, playoff:dict = None, year: int = 2020) -> dict:
+def get_coords(x: np.ndarray, y: np.ndarray, number_period: np.ndarray, team_side: np.ndarray,
+               home_team_initial_side) -> tuple:
+    # Version vectorisée de get_coor : même orientation, pour des tableaux de coordonnées
+    # (home_team_initial_side peut aussi être un tableau, une valeur par ligne)
+    home_left = np.asarray(home_team_initial_side) == 'left'
+    initial_left = np.where(np.asarray(team_side) == 'home', home_left, ~home_left)
+    # On change de camp aux périodes paires
+    left = initial_left ^ (np.asarray(number_period).astype(int) % 2 == 0)
 
-    
-    if year in team_shots_coords:
-        return team_shots_coords[year] 
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    return np.where(left, -y, y), np.where(left, x, -x)
 
-    year_shots_coords = {}
-    dfs_combined = regular_season[year]
-    if playoff is not None:
-        dfs_combined += playoff[year]
 
-    df_teams = pd.concat([df['eventOwnerTeam'] for df in dfs_combined])
-    unique_teams = df_teams.unique()
+def get_shoot_by_team(regular_season: dict = None, playoff: dict = None, year: int = 2020) -> dict:
+    # {équipe: (x, y)} des tirs d'une saison, orientés comme pour shotDistance (but attaqué en (0, 89)).
+    # Toute la saison dans un seul tableau : orientation vectorisée match par match puis un groupby.
+    # Import local : ift6758.data importe déjà ce module
+    from ift6758.data.registry import evaluate
 
-    for team in unique_teams:
+    key = (year, playoff is not None)
+    if key in team_shots_coords:
+        return team_shots_coords[key]
 
-        team_df = pd.concat([df[df['eventOwnerTeam'] == team] for df in dfs_combined])
-        coords_list = []
-        first_offensive_zone_event = team_df[team_df['zoneShoot'] == 'O'].iloc[0]
-        side = 'right' if first_offensive_zone_event['iceCoord'][0] < 0 else 'left'
-
-        for _, row in team_df.iterrows():
-            ice_coord = row['iceCoord']
-            if ice_coord is not None and all(pd.notnull(coord) for coord in ice_coord):
-                coords_list.append(get_coor(row, side))
+    # Nouvelle liste : la saison régulière de l'appelant n'est pas modifiée
+    dfs_combined = list(regular_season[year])
+    if playoff is not None:
+        dfs_combined += playoff[year]
+    df = pd.concat(dfs_combined, ignore_index=True)
 
-        x_coords = [coord[0] for coord in coords_list]
-        y_coords = [coord[1] for coord in coords_list]
+    adjusted = evaluate(df, ['_adjustedCoord'])['_adjustedCoord']
+    valid = ~np.isnan(adjusted).any(axis=1)
+    teams = df['eventOwnerTeam'].to_numpy()[valid]
+    adjusted = adjusted[valid]
 
-        year_shots_coords[team] = (x_coords, y_coords)
+    year_shots_coords = {team: (adjusted[positions, 0], adjusted[positions, 1])
+                         for team, positions in pd.Series(teams).groupby(teams, sort=False).indices.items()}
 
-    team_shots_coords[year] = year_shots_coords
+    team_shots_coords[key] = year_shots_coords
 
     return year_shots_coords
-
-
-
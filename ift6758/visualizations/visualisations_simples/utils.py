@@ -1,46 +1,107 @@
+import numpy as np
 import pandas as pd
 
+from ift6758.data.utils import compact_dtypes
+
+GAME_TYPE_NAMES = ('regular-season', 'playoffs')
+
+
+def season_blocks(data1: dict, data2: dict, years: list) -> list:
+    # (type de match, DataFrames des matchs) dans l'ordre du jeu de données : saison régulière puis séries,
+    # année par année
+    return [(game_type, data[year]) for year in sorted(set(years))
+            for game_type, data in zip(GAME_TYPE_NAMES, (data1, data2))]
+
+
+def assemble(blocks: list) -> pd.DataFrame:
+    # Une seule concaténation de tous les matchs ; Year (entier, comme dans le magasin de caractéristiques)
+    # et gameType sont construits d'un bloc, sans convertir idGame en chaîne ligne par ligne
+    df = pd.concat([frame for _, frames in blocks for frame in frames])
+
+    lengths = [sum(len(frame) for frame in frames) for _, frames in blocks]
+    game_types = np.repeat(np.array([game_type for game_type, _ in blocks], dtype=object), lengths)
+    codes, years = pd.factorize(df['idGame'].to_numpy() // 1_000_000)
+    df.insert(0, 'Year', years.astype(np.int64)[codes])
+    df.insert(2, 'gameType', game_types)
+    return compact_dtypes(df)
+
+
 def dic_to_df(data1: dict, data2: dict, years: list) -> pd.DataFrame:
-    df_data1_all = pd.DataFrame()
-    df_data2_all = pd.DataFrame()
-    df_data12_all = pd.DataFrame()
-    for year in set(years):
-        df_data1 = pd.concat(data1[year])
-        df_data2 = pd.concat(data2[year])
-        df_data1.insert(0, 'Year', df_data1['idGame'].astype(str).str[:4])
-        df_data2.insert(0, 'Year', df_data2['idGame'].astype(str).str[:4])
-        df_data1.insert(2, 'gameType', 'regular-season')
-        df_data2.insert(2, 'gameType', 'playoffs')
-        df_data12 = pd.concat([df_data1, df_data2], axis=0)
-        df_data1_all = pd.concat([df_data1_all, df_data1], axis=0)
-        df_data2_all = pd.concat([df_data2_all, df_data2], axis=0)
-        df_data12_all = pd.concat([df_data12_all, df_data12], axis=0)
-    return df_data12_all
+    # data1, data2 : saison régulière et séries par année, tels que retournés par data_clean
+    return assemble(season_blocks(data1, data2, years))
+
+
+def dic_to_csv(data1: dict, data2: dict, years: list, path: str) -> int:
+    # Même contenu que dic_to_df(...).to_csv(path, index=False), écrit une saison à la fois :
+    # seule la saison en cours est assemblée en mémoire. Retourne le nombre de lignes écrites.
+    blocks = season_blocks(data1, data2, years)
+    nb_rows = 0
+    for start in range(0, len(blocks), len(GAME_TYPE_NAMES)):
+        df = assemble(blocks[start:start + len(GAME_TYPE_NAMES)])
+        df.to_csv(path, index=False, mode='w' if start == 0 else 'a', header=start == 0)
+        nb_rows += len(df)
+    return nb_rows
+
+
+# Dimensions catégorielles communes des tableaux de taux de buts
+CUBE_DIMENSIONS = ['Year', 'gameType', 'shotType', 'eventOwnerTeam', 'isGoalAdvantage', 'emptyGoalNet', 'isGoal']
+
+
+class ShotCube:
+    # Nombre de tirs pour chaque combinaison des dimensions, calculé une fois : tout tableau croisé
+    # à une ou deux entrées sur ces dimensions s'en déduit sans relire les tirs
+    def __init__(self, df: pd.DataFrame = None, dimensions: list = CUBE_DIMENSIONS, counts: pd.Series = None):
+        if counts is None:
+            dimensions = [dimension for dimension in dimensions if dimension in df.columns]
+            counts = df[dimensions].astype(object).groupby(dimensions, dropna=False).size()
+        self.counts = counts
+
+    def filter(self, **selection) -> 'ShotCube':
+        # ex. cube.filter(Year=2016, gameType='regular-season') ; les valeurs sont comparées en texte,
+        # Year='2016' désigne donc la même saison. Une sélection vide est une erreur, pas un tableau de zéros.
+        mask = np.ones(len(self.counts), dtype=bool)
+        for dimension, value in selection.items():
+            mask &= np.asarray(self.counts.index.get_level_values(dimension).astype(str) == str(value))
+        if not mask.any():
+            raise ValueError(f"No shots match {selection}")
+        return ShotCube(counts=self.counts[mask])
+
+    def crosstab(self, index: str, columns, margins: bool = False, margins_name: str = "All") -> pd.DataFrame:
+        columns = [columns] if isinstance(columns, str) else list(columns)
+        q = self.counts.groupby(level=[index] + columns).sum().unstack(columns, fill_value=0)
+        if margins:
+            q[margins_name] = q.sum(axis=1)
+            q.loc[margins_name] = q.sum(axis=0)
+        return q
+
+
+def crosstab(data, index: str, columns, margins: bool = False, margins_name: str = "All") -> pd.DataFrame:
+    # data : tableau des tirs (pd.crosstab) ou ShotCube
+    if isinstance(data, ShotCube):
+        return data.crosstab(index, columns, margins, margins_name)
+    columns = [columns] if isinstance(columns, str) else list(columns)
+    return pd.crosstab(index=data[index], columns=[data[column] for column in columns] if len(columns) > 1
+                       else data[columns[0]], margins=margins, margins_name=margins_name)
+
 
 def var_corr(df, index, column):
-    q = pd.crosstab(index=df[index], columns=df[column], margins=True, margins_name="Total")
+    q = crosstab(df, index, column, margins=True, margins_name="Total")
     q[f"%{q.columns[0]}"] = round(q.iloc[:, 0] / q['Total'] * 100, 2)
     q.sort_values(by=[f"%{q.columns[0]}"], ascending=False, inplace=True)
     return q.fillna(0)
 
 
 def var2_corr(df, index, column1, column2, column2_modality):
-    q = pd.crosstab(index=df[index], columns=[df[column1], df[column2]]
-                    )
-    q = q.T.reset_index()
-    q.fillna(0, inplace=True)
-    q[f"{column1}_{column2}"] = q[column1].astype(str).fillna(0) + '_' + q[column2].astype(str).fillna(0)
-    q = q.drop([column1, column2], axis=1)
-    q = q.set_index(f"{column1}_{column2}")
-    q = q.T
-    q.columns.name = None
+    q = crosstab(df, index, [column1, column2])
+
+    # Pour chaque modalité de column1 : total, nombre pour column2_modality et pourcentage
+    totals = q.T.groupby(level=0, observed=True).sum().T
+    selected = q.xs(column2_modality, axis=1, level=1)
     q2 = {}
-    for elem in df[column1][pd.notna(df[column1])].unique():
-        q2[f"{elem}_Total"] = 0
-        for elem2 in df[column2][pd.notna(df[column2])].unique():
-            if elem2 == column2_modality:
-                q2[f"{elem}_{elem2}"] = q[f"{elem}_{elem2}"]
-            q2[f"{elem}_Total"] += q[f"{elem}_{elem2}"]
-        q2[f"{elem}_{column2_modality}_%"] = round(q2[f"{elem}_{column2_modality}"] / q2[f"{elem}_Total"] * 100, 2)
+    for elem in totals.columns:
+        q2[f"{elem}_Total"] = totals[elem]
+        if elem in selected.columns:
+            q2[f"{elem}_{column2_modality}"] = selected[elem]
+            q2[f"{elem}_{column2_modality}_%"] = round(selected[elem] / totals[elem] * 100, 2)
     q2 = pd.DataFrame(q2)
     return q2